@@ -1,17 +1,30 @@
-import pandas as pd
 import random
-import matplotlib.pyplot as plt
-from collections import defaultdict
+import numpy as np
+from banker import BankerState
+from instrumentation import EventLog, scheduler_hooks, timed
+from list_scheduler import list_schedule
+from procedure_io import write_procedures_csv
+from procedure_table import ProcedureTable
+from rendering import render_charts, render_gantt
 
 NUM_OPERATING_ROOMS = 2
 SIMULATION_TIME = 480
+EQUIPMENT_UNITS = 1
+SURGEON_UNITS = 1
 
 urgency_levels = ['Normal', 'Emergency']
 procedure_names = ['Appendectomy', 'Cholecystectomy', 'Hysterectomy', 'Laparoscopy', 'Prostatectomy']
 available_equipment = ['Laparoscope', 'Endoscope', 'Microscope', 'Ultrasound']
 surgeon_names = ['Dr. Smith', 'Dr. Johnson', 'Dr. Brown', 'Dr. Davis', 'Dr. Garcia']
 
+# Column layout of the Banker's matrices: one room column, then one per equipment and per surgeon
+resource_names = ['Operating Room'] + available_equipment + surgeon_names
+resource_index = {name: i for i, name in enumerate(resource_names)}
+
 class SurgicalProcedure:
+    __slots__ = ('procedure_id', 'urgency_level', 'procedure_name', 'equipment', 'surgeon',
+                 'arrival_time', 'duration', 'start_time', 'end_time', 'remaining_time')
+
     def __init__(self, procedure_id, urgency_level, procedure_name, equipment, surgeon, arrival_time, duration):
         self.procedure_id = procedure_id
         self.urgency_level = urgency_level
@@ -26,190 +39,110 @@ class SurgicalProcedure:
 
 def load_dataset(filename):
     try:
-        df = pd.read_csv(filename)
+        return ProcedureTable.read_csv(filename)
     except FileNotFoundError:
         return []
-    procedures = []
-    for _, row in df.iterrows():
-        procedure = SurgicalProcedure(row['id'], row['urgency_level'], row['procedure_name'],
-                                      row['equipment'], row['surgeon'], row['arrival_time'], row['duration'])
-        procedures.append(procedure)
-    return procedures
 
-def save_procedures_to_csv(procedures):
-    df = pd.DataFrame([vars(p) for p in procedures])
-    df.to_csv("procedures.csv", index=False)
+def save_procedures_to_csv(procedures, filename="procedures.csv"):
+    write_procedures_csv(procedures, filename)
 
-def create_procedures(num_procedures):
-    procedures = []
+def create_procedures(num_procedures, output_path="procedures.csv"):
+    columns = {name: [] for name in ('urgency_level', 'procedure_name', 'equipment', 'surgeon', 'arrival_time', 'duration')}
     for i in range(num_procedures):
-        procedure_id = i
-        urgency_level = 'Emergency' if random.random() < 0.3 else 'Normal'  # 30% chance for Emergency
-        procedure_name = random.choice(procedure_names)
-        equipment = random.choice(available_equipment) if random.random() < 0.5 else None
-        surgeon = random.choice(surgeon_names) if random.random() < 0.5 else None
-        arrival_time = random.randint(0, 20)
-        duration = random.uniform(1, 5)
-        procedure = SurgicalProcedure(procedure_id, urgency_level, procedure_name, equipment, surgeon, arrival_time, duration)
-        procedures.append(procedure)
-    
-    save_procedures_to_csv(procedures)
+        columns['urgency_level'].append('Emergency' if random.random() < 0.3 else 'Normal')  # 30% chance for Emergency
+        columns['procedure_name'].append(random.choice(procedure_names))
+        columns['equipment'].append(random.choice(available_equipment) if random.random() < 0.5 else None)
+        columns['surgeon'].append(random.choice(surgeon_names) if random.random() < 0.5 else None)
+        columns['arrival_time'].append(random.randint(0, 20))
+        columns['duration'].append(random.uniform(1, 5))
+    procedures = ProcedureTable.from_columns(range(num_procedures), **columns)
+
+    if output_path is not None:
+        save_procedures_to_csv(procedures, output_path)
     return procedures
 
-def plot_gantt_chart(procedures):
-    fig, ax = plt.subplots(figsize=(10, len(procedures) * 0.5))
-    for i, procedure in enumerate(procedures):
-        if procedure.start_time is not None and procedure.end_time is not None:
-            duration = procedure.end_time - procedure.start_time
-            ax.barh(i, duration, left=procedure.start_time, color='blue', alpha=0.7, edgecolor='black')
-            ax.text(procedure.start_time + 5, i, f"{procedure.procedure_name} (ID: {procedure.procedure_id})",
-                    verticalalignment='center', fontsize=8)
-            ax.text(procedure.start_time + 5, i + 0.2, f"Surgeon: {procedure.surgeon}",
-                    verticalalignment='center', fontsize=6)
-            ax.text(procedure.start_time + 5, i - 0.2, f"Urgency: {procedure.urgency_level}",
-                    verticalalignment='center', fontsize=6)
-    ax.set_xlabel('Time (minutes)')
-    ax.set_ylabel('Procedures')
-    ax.set_title('Surgical Procedures Gantt Chart')
-    ax.set_yticks(range(len(procedures)))
-    ax.set_yticklabels([f"{procedure.procedure_name} (ID: {procedure.procedure_id})" for procedure in procedures])
-    ax.grid(True)
-    plt.show()
-
-def plot_charts(resource_allocation):
-    fig, axs = plt.subplots(nrows=3, ncols=1, figsize=(12, 18), sharex=True)
-
-    # Plot resource allocation graph for rooms
-    room_data = []
-    for sub_resource_name, sub_allocation_data in resource_allocation['rooms'].items():
-        if isinstance(sub_allocation_data, list):
-            if sub_allocation_data:
-                room_data.extend(sub_allocation_data)
-
-    times, availability = zip(*room_data)
-    axs[0].step(times, availability, where='post', label='Room Availability')
-
-    axs[0].set_title('Room Allocation Over Time', fontsize=14)
-    axs[0].set_ylabel('Number of Available Rooms', fontsize=12)
-    axs[0].legend(fontsize=12, loc='upper right')
-    axs[0].grid(True)
-    axs[0].set_ylim(0, NUM_OPERATING_ROOMS)  # Set y-axis limits
-
-    # Plot resource allocation graph for equipment
-    for sub_resource_name, sub_allocation_data in resource_allocation['equipment'].items():
-        if isinstance(sub_allocation_data, list):
-            if sub_allocation_data:
-                times, availability = zip(*sub_allocation_data)
-                axs[1].step(times, availability, where='post', label=sub_resource_name)
-
-    axs[1].set_title('Equipment Allocation Over Time', fontsize=14)
-    axs[1].set_ylabel('Number of Available Equipment', fontsize=12)
-    axs[1].legend(fontsize=12, loc='upper right')
-    axs[1].grid(True)
-    axs[1].set_ylim(0, len(available_equipment))  # Set y-axis limits
-
-    # Plot resource allocation graph for doctors
-    for sub_resource_name, sub_allocation_data in resource_allocation['doctors'].items():
-        if isinstance(sub_allocation_data, list):
-            if sub_allocation_data:
-                times, availability = zip(*sub_allocation_data)
-                axs[2].step(times, availability, where='post', label=sub_resource_name)
-
-    axs[2].set_title('Doctor Allocation Over Time', fontsize=14)
-    axs[2].set_ylabel('Number of Available Doctors', fontsize=12)
-    axs[2].legend(fontsize=12, loc='upper right')
-    axs[2].grid(True)
-    axs[2].set_ylim(0, len(surgeon_names))  # Set y-axis limits
-
-    plt.subplots_adjust(hspace=0.5)  # Increase vertical spacing between subplots
-
-    # Set shared x-axis label and adjust tick label format
-    fig.supxlabel('Time (minutes)', fontsize=14)
-    for ax in axs:
-        ax.xaxis.set_major_formatter(plt.FuncFormatter(lambda x, _: f"{int(x):03d}"))
-
-    plt.tight_layout()
-    plt.show()
-
-def priority_scheduling_no_deadlocks(procedures):
-    available_equipment_dict = {equip: 1 for equip in available_equipment}
-    available_surgeons = {doctor: 1 for doctor in surgeon_names}
-
-    max_resources = defaultdict(list)
-    allocated_resources = defaultdict(list)
-
-    for i, procedure in enumerate(procedures):
-        max_resources[i] = [1, available_equipment_dict[procedure.equipment] if procedure.equipment else 0, 1 if procedure.surgeon else 0]
-        allocated_resources[i] = [0] * len(max_resources[i])
+def plot_gantt_chart(procedures, output_path=None, rooms=None):
+    return render_gantt(procedures, output_path, rooms)
+
+def plot_charts(resource_allocation, output_path=None):
+    return render_charts(resource_allocation, NUM_OPERATING_ROOMS, len(available_equipment), len(surgeon_names), output_path)
+
+def procedure_demand(procedure):
+    demand = np.zeros(len(resource_names), dtype=np.int64)
+    demand[resource_index['Operating Room']] = 1
+    if procedure.equipment in resource_index:
+        demand[resource_index[procedure.equipment]] = 1
+    if procedure.surgeon in resource_index:
+        demand[resource_index[procedure.surgeon]] = 1
+    return demand
+
+def priority_scheduling_no_deadlocks(procedures, log=None):
+    with timed(log, 'banker_setup'):
+        available_resources = [NUM_OPERATING_ROOMS] + [EQUIPMENT_UNITS] * len(available_equipment) + [SURGEON_UNITS] * len(surgeon_names)
+        max_resources = [procedure_demand(procedure) for procedure in procedures]
+        banker = BankerState(available_resources, max_resources)
 
     current_time = 0
-    safe_sequence = banker_algorithm([NUM_OPERATING_ROOMS] + list(available_equipment_dict.values()) + list(available_surgeons.values()),
-                                    list(max_resources.values()),
-                                    list(allocated_resources.values()))
+    with timed(log, 'safe_sequence'):
+        safe_sequence = banker.safe_sequence()
 
     if safe_sequence is None:
-        print("Deadlock detected! Using alternative priority scheduling...")
-        procedures.sort(key=lambda p: (p.urgency_level == 'Emergency', p.arrival_time), reverse=True)
-        
-        scheduled_procedures = [proc for proc in procedures
-                                if not (proc.surgeon and
-                                        max_resources[proc.procedure_id][2] == allocated_resources[proc.procedure_id][2] and
-                                        all(allo_resource[1] > 0 for allo_resource in allocated_resources.values()
-                                            if (allo_resource[1] > 0) and (allo_resource[0] == proc.procedure_id)))]
+        if log is not None:
+            log.deadlock_fallback(current_time, len(procedures))
+        # Skip procedures that already hold their whole claim (nothing left to wait for)
+        holding_all = banker.allocation.any(axis=1) & ~banker.need.any(axis=1)
+        scheduled_procedures = [proc for i, proc in enumerate(procedures) if not holding_all[i]]
         scheduled_procedures.sort(key=lambda p: p.arrival_time)
 
-        for procedure in scheduled_procedures:
-            if procedure.start_time is None:
-                procedure.start_time = current_time
-                print(f"Starting {procedure.procedure_name} (ID: {procedure.procedure_id}) with urgency level {procedure.urgency_level} at time {current_time}")
-
-                allocate_resources(procedure, allocated_resources)
+        with timed(log, 'fallback_schedule'):
+            schedule = list_schedule([proc for proc in scheduled_procedures if proc.start_time is None],
+                                     NUM_OPERATING_ROOMS, equipment_units(), surgeon_units(), current_time,
+                                     **scheduler_hooks(log))
 
-                current_time += procedure.duration
+        room_of = {procedure: room for procedure, room in schedule}
+        plot_gantt_chart(scheduled_procedures, rooms=[room_of.get(procedure, -1) for procedure in scheduled_procedures])
+        return schedule
 
-                procedure.end_time = current_time
-                print(f"Completed {procedure.procedure_name} (ID: {procedure.procedure_id}) at time {current_time}")
+    else:
+        with timed(log, 'banker_schedule'):
+            return priority_scheduling_banker(procedures, banker, safe_sequence, current_time, log)
 
-                deallocate_resources(procedure, allocated_resources)
+def equipment_units():
+    return {equip: EQUIPMENT_UNITS for equip in available_equipment}
 
-        plot_gantt_chart(scheduled_procedures)
+def surgeon_units():
+    return {doctor: SURGEON_UNITS for doctor in surgeon_names}
 
-    else:
-        priority_scheduling_banker(procedures, allocated_resources, safe_sequence, current_time)
+# Banker rows are positions in the list the matrices were built from, not procedure ids
+def allocate_resources(procedure, banker, row):
+    return banker.request(row, procedure_demand(procedure))
 
-def allocate_resources(procedure, allocated_resources):
-    available_equipment_dict[procedure.equipment] -= 1
-    allocated_resources[procedure.procedure_id][1] = 1
-    
-    if procedure.surgeon:
-        available_surgeons[procedure.surgeon] -= 1
-        allocated_resources[procedure.procedure_id][2] = 1
+def deallocate_resources(procedure, banker, row):
+    banker.release(row)
 
-def deallocate_resources(procedure, allocated_resources):
-    available_equipment_dict[procedure.equipment] += 1
-    allocated_resources[procedure.procedure_id][1] = 0
+def priority_scheduling_banker(procedures, banker, safe_sequence, current_time, log=None):
+    rows = {}
+    def start_if_safe(procedure, time, room):
+        if not allocate_resources(procedure, banker, rows[procedure]):
+            return False
+        if log is not None:
+            log.start(time, procedure, room)
 
-    if procedure.surgeon:
-        available_surgeons[procedure.surgeon] += 1
-        allocated_resources[procedure.procedure_id][2] = 0
+    def finish(procedure, time, room):
+        if log is not None:
+            log.end(time, procedure, room)
+        deallocate_resources(procedure, banker, rows[procedure])
 
-def priority_scheduling_banker(procedures, allocated_resources, safe_sequence, current_time):
     for i in safe_sequence:
         procedure = procedures[i]
-
         if procedure.start_time is None:
-            procedure.start_time = current_time
-            print(f"Starting {procedure.procedure_name} (ID: {procedure.procedure_id}) with urgency level {procedure.urgency_level} at time {current_time}")
-
-            allocate_resources(procedure, allocated_resources)
-
-            current_time += procedure.duration
-
-            procedure.end_time = current_time
-            print(f"Completed {procedure.procedure_name} (ID: {procedure.procedure_id}) at time {current_time}")
+            rows[procedure] = i
+    safe_procedures = list(rows)
+    on_arrival = scheduler_hooks(log).get('on_arrival')
+    return list_schedule(safe_procedures, NUM_OPERATING_ROOMS, equipment_units(), surgeon_units(), current_time,
+                         on_start=start_if_safe, on_end=finish, on_arrival=on_arrival)
 
-            deallocate_resources(procedure, allocated_resources)
 if __name__ == "__main__":
     num_procedures = int(input("Enter number of procedures: "))
     procedures = create_procedures(num_procedures)
-    priority_scheduling_no_deadlocks(procedures)
\ No newline at end of file
+    priority_scheduling_no_deadlocks(procedures, EventLog(echo=True))
\ No newline at end of file
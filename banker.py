@@ -0,0 +1,222 @@
+import numpy as np
+
+
+def _as_vector(values, num_resources):
+    vector = np.asarray(values, dtype=np.int64).reshape(-1)
+    if vector.shape[0] != num_resources:
+        raise ValueError(f"Expected {num_resources} resource counts, got {vector.shape[0]}")
+    return vector
+
+
+def _as_matrix(rows, num_resources):
+    matrix = np.asarray(rows, dtype=np.int64)
+    if matrix.size == 0:
+        return np.zeros((0, num_resources), dtype=np.int64)
+    if matrix.ndim != 2 or matrix.shape[1] != num_resources:
+        raise ValueError(f"Expected rows of {num_resources} resource counts, got shape {matrix.shape}")
+    return matrix
+
+
+class BankerState:
+    def __init__(self, available, max_resources, allocated_resources=None):
+        self.available = np.asarray(available, dtype=np.int64).reshape(-1).copy()
+        self.num_resources = self.available.shape[0]
+        max_matrix = _as_matrix(max_resources, self.num_resources)
+        if allocated_resources is None:
+            allocation = np.zeros_like(max_matrix)
+        else:
+            allocation = _as_matrix(allocated_resources, self.num_resources)
+        if allocation.shape != max_matrix.shape:
+            raise ValueError("Max and allocation matrices must have the same shape")
+        if np.any(allocation < 0) or np.any(self.available < 0):
+            raise ValueError("Resource counts must be non-negative")
+        if np.any(allocation > max_matrix):
+            raise ValueError("Allocation exceeds the maximum claim of a procedure")
+
+        self.size = max_matrix.shape[0]
+        capacity = max(self.size, 16)
+        self._max = np.zeros((capacity, self.num_resources), dtype=np.int64)
+        self._allocation = np.zeros_like(self._max)
+        self._need = np.zeros_like(self._max)
+        self._max[:self.size] = max_matrix
+        self._allocation[:self.size] = allocation
+        self._need[:self.size] = max_matrix - allocation
+        self.total = self.available + allocation.sum(axis=0)
+
+        # Cached safe sequence, the work vector available just before each of its
+        # steps, and the position of every process in it. None while unsafe.
+        self._sequence = None
+        self._work = None
+        # Set when the state is known to be safe but the cached sequence is out of date
+        self._stale = False
+        self._position = np.zeros(capacity, dtype=np.int64)
+        self._refresh()
+
+    @property
+    def max(self):
+        return self._max[:self.size]
+
+    @property
+    def allocation(self):
+        return self._allocation[:self.size]
+
+    @property
+    def need(self):
+        return self._need[:self.size]
+
+    def is_safe(self):
+        return self._stale or self._sequence is not None
+
+    def safe_sequence(self):
+        if self._stale:
+            self._refresh()
+        if self._sequence is None:
+            return None
+        return self._sequence.tolist()
+
+    def add_process(self, max_claim):
+        max_claim = _as_vector(max_claim, self.num_resources)
+        if np.any(max_claim < 0):
+            raise ValueError("Resource counts must be non-negative")
+        if np.any(max_claim > self.total):
+            raise ValueError("Maximum claim exceeds the total resources of the system")
+        if self.size == self._max.shape[0]:
+            self._grow()
+        index = self.size
+        self.size += 1
+        self._max[index] = max_claim
+        self._allocation[index] = 0
+        self._need[index] = max_claim
+        if self._sequence is None and not self._stale:
+            self._refresh()
+        elif not self._stale:
+            # Everything else can finish first, so the new process always fits at the end.
+            self._position[index] = self._sequence.shape[0]
+            self._sequence = np.append(self._sequence, index)
+            self._work = np.vstack([self._work, self.total])
+        return index
+
+    def request(self, index, amounts):
+        amounts = _as_vector(amounts, self.num_resources)
+        if np.any(amounts < 0):
+            raise ValueError("Requested amounts must be non-negative")
+        if np.any(amounts > self._need[index]):
+            raise ValueError(f"Process {index} requested more than its maximum claim")
+        if np.any(amounts > self.available):
+            return False
+
+        if (self._sequence is not None or self._stale) and np.array_equal(amounts, self._need[index]):
+            # From a safe state, a process holding its whole claim can always run first, so the
+            # grant stays safe without a check; the cached sequence is rebuilt lazily when next needed.
+            self._apply(index, amounts)
+            self._stale = True
+            return True
+        if self._stale:
+            self._refresh()
+
+        self._apply(index, amounts)
+        if self._sequence is None:
+            self._refresh()
+            if self._sequence is None:
+                self._apply(index, -amounts)
+                return False
+            return True
+
+        # Granting to the process at position p only shrinks the work vector seen by
+        # the steps before it, so only that prefix has to be re-checked.
+        position = self._position[index]
+        head = self._sequence[:position]
+        head_work = self._work[:position] - amounts
+        failing = np.flatnonzero(np.any(self._need[head] > head_work, axis=1))
+        if failing.size == 0:
+            self._work[:position + 1] -= amounts
+            return True
+
+        start = failing[0]
+        pending = np.ones(self.size, dtype=bool)
+        pending[self._sequence[:start]] = False
+        result = self._search(pending, self._work[start] - amounts)
+        if result is None:
+            self._apply(index, -amounts)
+            return False
+        order, work = result
+        self._commit(np.concatenate([self._sequence[:start], order]),
+                     np.concatenate([head_work[:start], work]))
+        return True
+
+    def release(self, index, amounts=None):
+        if amounts is None:
+            amounts = self._allocation[index].copy()
+        else:
+            amounts = _as_vector(amounts, self.num_resources)
+        if np.any(amounts < 0):
+            raise ValueError("Released amounts must be non-negative")
+        if np.any(amounts > self._allocation[index]):
+            raise ValueError(f"Process {index} released more than it holds")
+
+        self._apply(index, -amounts)
+        if self._sequence is None and not self._stale:
+            self._refresh()
+        elif not self._stale:
+            # A release never breaks the cached sequence; it only raises the work
+            # vector seen up to and including the releasing process.
+            self._work[:self._position[index] + 1] += amounts
+
+    def finish(self, index):
+        self.release(index)
+        self._max[index] = 0
+        self._need[index] = 0
+
+    def _apply(self, index, amounts):
+        self.available -= amounts
+        self._allocation[index] += amounts
+        self._need[index] -= amounts
+
+    def _grow(self):
+        capacity = self._max.shape[0] * 2
+        for name in ('_max', '_allocation', '_need'):
+            old = getattr(self, name)
+            new = np.zeros((capacity, self.num_resources), dtype=np.int64)
+            new[:old.shape[0]] = old
+            setattr(self, name, new)
+        position = np.zeros(capacity, dtype=np.int64)
+        position[:self._position.shape[0]] = self._position
+        self._position = position
+
+    def _search(self, pending, work):
+        # Every round admits all pending processes whose need fits the current work
+        # vector at once; finishing them only adds resources, so any order among them is safe.
+        orders, works = [], []
+        candidates = np.flatnonzero(pending)
+        while candidates.size:
+            fits = np.all(self._need[candidates] <= work, axis=1)
+            ready = candidates[fits]
+            if ready.size == 0:
+                return None
+            allocation = self._allocation[ready]
+            cumulative = np.cumsum(allocation, axis=0)
+            orders.append(ready)
+            works.append(work + cumulative - allocation)
+            work = work + cumulative[-1]
+            candidates = candidates[~fits]
+        if not orders:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, self.num_resources), dtype=np.int64)
+        return np.concatenate(orders), np.concatenate(works)
+
+    def _refresh(self):
+        self._stale = False
+        result = self._search(np.ones(self.size, dtype=bool), self.available.copy())
+        if result is None:
+            self._sequence = None
+            self._work = None
+        else:
+            self._commit(*result)
+
+    def _commit(self, sequence, work):
+        self._sequence = sequence
+        self._work = work
+        self._position[sequence] = np.arange(sequence.shape[0])
+
+
+def banker_algorithm(available, max_resources, allocated_resources):
+    return BankerState(available, max_resources, allocated_resources).safe_sequence()
@@ -0,0 +1,214 @@
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import simpy
+
+import Code
+import phase1
+
+CASES = ['create_procedures', 'load_dataset', 'priority_scheduling_no_deadlocks', 'schedule_surgeries', 'room_process']
+DEFAULT_PROCEDURES = [100, 1000, 5000]
+DEFAULT_ROOMS = [2, 8]
+DEFAULT_UNITS = [1, 2]
+DEFAULT_TOLERANCE = 0.2
+
+
+@contextlib.contextmanager
+def configured(num_rooms, units):
+    # Both scripts read their room and resource counts from module constants
+    saved = (Code.NUM_OPERATING_ROOMS, Code.EQUIPMENT_UNITS, Code.SURGEON_UNITS, phase1.NUM_OPERATING_ROOMS)
+    Code.NUM_OPERATING_ROOMS = phase1.NUM_OPERATING_ROOMS = num_rooms
+    Code.EQUIPMENT_UNITS = Code.SURGEON_UNITS = units
+    try:
+        yield
+    finally:
+        Code.NUM_OPERATING_ROOMS, Code.EQUIPMENT_UNITS, Code.SURGEON_UNITS, phase1.NUM_OPERATING_ROOMS = saved
+
+
+def _procedures(num_procedures, seed):
+    return phase1.create_procedures(num_procedures, output_path=None, rng=random.Random(seed))
+
+
+def _run_events(env, until=None):
+    # Stepping by hand counts every processed event, so throughput is events per second
+    events = 0
+    while env.peek() != float('inf') and (until is None or env.peek() < until):
+        env.step()
+        events += 1
+    return events
+
+
+def setup_case(case, num_procedures, num_rooms, units, seed, directory):
+    # Returns the timed callable; it must return the number of events (or items) it processed
+    if case == 'create_procedures':
+        path = os.path.join(directory, 'generated.csv')
+
+        def run():
+            random.seed(seed)
+            Code.create_procedures(num_procedures, output_path=path)
+            return num_procedures
+        return run
+
+    if case == 'load_dataset':
+        path = os.path.join(directory, f'dataset_{num_procedures}.csv')
+        if not os.path.exists(path):
+            Code.save_procedures_to_csv(_procedures(num_procedures, seed), path)
+        return lambda: len(Code.load_dataset(path))
+
+    procedures = _procedures(num_procedures, seed)
+    if case == 'priority_scheduling_no_deadlocks':
+        return lambda: len(Code.priority_scheduling_no_deadlocks(procedures))
+
+    env = simpy.Environment()
+    room_resources = simpy.PriorityResource(env, capacity=num_rooms)
+    resource_allocation = phase1.new_resource_allocation(num_rooms)
+    equipment_units = {equip: units for equip in phase1.available_equipment}
+    surgeon_units = {doctor: units for doctor in phase1.surgeon_names}
+    if case == 'schedule_surgeries':
+        tracker = phase1.ResourceTracker(resource_allocation, num_rooms, equipment_units, surgeon_units)
+        tracker.record_initial(env.now)
+
+        def run():
+            phase1.schedule_surgeries(env, procedures, room_resources, resource_allocation, tracker, random.Random(seed))
+            return _run_events(env)
+        return run
+
+    if case == 'room_process':
+        def run():
+            for i in range(num_rooms):
+                env.process(phase1.room_process(env, room_resources, resource_allocation, procedures, i))
+            phase1.schedule_surgeries(env, procedures, room_resources, resource_allocation, None, random.Random(seed))
+            return _run_events(env, phase1.SIMULATION_TIME)
+        return run
+
+    raise ValueError(f"Unknown benchmark case: {case}")
+
+
+def measure(case, num_procedures, num_rooms, units, repeat=3, seed=0, directory=None):
+    with contextlib.ExitStack() as stack:
+        if directory is None:
+            directory = stack.enter_context(tempfile.TemporaryDirectory())
+        devnull = stack.enter_context(open(os.devnull, 'w'))
+        stack.enter_context(contextlib.redirect_stdout(devnull))
+        stack.enter_context(configured(num_rooms, units))
+
+        wall_times = []
+        for _ in range(repeat):
+            run = setup_case(case, num_procedures, num_rooms, units, seed, directory)
+            start = time.perf_counter()
+            events = run()
+            wall_times.append(time.perf_counter() - start)
+
+        # Peak memory comes from a separate traced run so tracing does not skew the timings
+        run = setup_case(case, num_procedures, num_rooms, units, seed, directory)
+        tracemalloc.start()
+        try:
+            run()
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    wall_time = min(wall_times)
+    return {'case': case, 'procedures': num_procedures, 'rooms': num_rooms, 'units': units,
+            'wall_time': wall_time, 'wall_times': wall_times, 'peak_memory': peak_memory, 'events': events,
+            'events_per_second': events / wall_time if wall_time > 0 else float('inf')}
+
+
+def run_benchmarks(cases=CASES, procedure_counts=DEFAULT_PROCEDURES, room_counts=DEFAULT_ROOMS,
+                   unit_counts=DEFAULT_UNITS, repeat=3, seed=0, progress=None):
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for case, num_procedures, num_rooms, units in itertools.product(cases, procedure_counts, room_counts, unit_counts):
+            if case in ('create_procedures', 'load_dataset') and (num_rooms, units) != (room_counts[0], unit_counts[0]):
+                continue  # generation and loading do not depend on the room or resource counts
+            result = measure(case, num_procedures, num_rooms, units, repeat, seed, directory)
+            results.append(result)
+            if progress is not None:
+                progress(result)
+    return {'meta': {'python': platform.python_version(), 'platform': platform.platform(),
+                     'numpy': np.__version__, 'simpy': simpy.__version__, 'repeat': repeat, 'seed': seed,
+                     'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')},
+            'results': results}
+
+
+def save_results(report, filename):
+    with open(filename, 'w') as handle:
+        json.dump(report, handle, indent=2)
+
+
+def load_results(filename):
+    with open(filename) as handle:
+        return json.load(handle)
+
+
+def _result_key(result):
+    return (result['case'], result['procedures'], result['rooms'], result['units'])
+
+
+def compare(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    # A case regresses when it got slower than the baseline by more than the tolerance
+    previous = {_result_key(result): result for result in baseline['results']}
+    comparisons = []
+    for result in report['results']:
+        before = previous.get(_result_key(result))
+        if before is None or before['wall_time'] <= 0:
+            continue
+        ratio = result['wall_time'] / before['wall_time']
+        comparisons.append({'case': result['case'], 'procedures': result['procedures'], 'rooms': result['rooms'],
+                            'units': result['units'], 'baseline': before['wall_time'], 'current': result['wall_time'],
+                            'ratio': ratio, 'memory_ratio': result['peak_memory'] / max(before['peak_memory'], 1),
+                            'regression': ratio > 1 + tolerance})
+    return comparisons
+
+
+def format_result(result):
+    return (f"{result['case']:>33} n={result['procedures']:<7} rooms={result['rooms']:<3} units={result['units']:<2}"
+            f" {result['wall_time']:9.4f}s {result['peak_memory'] / 2**20:9.2f} MiB"
+            f" {result['events_per_second']:12.0f} ev/s")
+
+
+def format_comparison(comparison):
+    status = 'REGRESSION' if comparison['regression'] else 'ok'
+    return (f"{comparison['case']:>33} n={comparison['procedures']:<7} rooms={comparison['rooms']:<3}"
+            f" units={comparison['units']:<2} {comparison['baseline']:9.4f}s -> {comparison['current']:9.4f}s"
+            f" x{comparison['ratio']:.2f} {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark procedure generation, loading, scheduling and simulation.")
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=CASES)
+    parser.add_argument('--procedures', nargs='+', type=int, default=DEFAULT_PROCEDURES)
+    parser.add_argument('--rooms', nargs='+', type=int, default=DEFAULT_ROOMS)
+    parser.add_argument('--units', nargs='+', type=int, default=DEFAULT_UNITS,
+                        help="units of every equipment type and surgeon")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="compare against results from an earlier run")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.cases, args.procedures, args.rooms, args.units, args.repeat, args.seed,
+                            progress=lambda result: print(format_result(result), flush=True))
+    if args.output:
+        save_results(report, args.output)
+    if args.baseline:
+        comparisons = compare(report, load_results(args.baseline), args.tolerance)
+        for comparison in comparisons:
+            print(format_comparison(comparison))
+        if any(comparison['regression'] for comparison in comparisons):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
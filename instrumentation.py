@@ -0,0 +1,143 @@
+import time
+from collections import deque, namedtuple
+from contextlib import contextmanager, nullcontext
+
+ARRIVAL = 'arrival'
+QUEUED = 'queued'
+START = 'start'
+END = 'end'
+CONFLICT = 'conflict'
+DEADLOCK_FALLBACK = 'deadlock_fallback'
+EVENT_KINDS = [ARRIVAL, QUEUED, START, END, CONFLICT, DEADLOCK_FALLBACK]
+
+# value holds the queue wait for start events, the duration for end events and the
+# missing resource for conflicts
+Event = namedtuple('Event', ['kind', 'time', 'procedure_id', 'room', 'value'])
+
+
+class Histogram:
+    def __init__(self, bin_width=1.0, num_bins=240):
+        self.bin_width = bin_width
+        self.counts = [0] * (num_bins + 1)  # the last bin collects everything past the range
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def add(self, value):
+        self.counts[min(int(value / self.bin_width), len(self.counts) - 1)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.maximum:
+            self.maximum = value
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q):
+        # Upper edge of the bin holding the q-th percentile, capped at the largest value seen
+        if not self.count:
+            return 0.0
+        target = q / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count:
+                return min((index + 1) * self.bin_width, self.maximum)
+        return self.maximum
+
+    def to_dict(self):
+        return {'count': self.count, 'mean': self.mean, 'max': self.maximum, 'p50': self.percentile(50),
+                'p90': self.percentile(90), 'p99': self.percentile(99), 'bin_width': self.bin_width,
+                'counts': list(self.counts)}
+
+
+class EventLog:
+    # Schedulers take log=None and skip every call when no log is given, so the default
+    # path does no formatting, printing or bookkeeping at all.
+    def __init__(self, capacity=10_000, echo=False, origin=0):
+        self.events = deque(maxlen=capacity)
+        self.echo = echo
+        self.counts = dict.fromkeys(EVENT_KINDS, 0)
+        self.queue_wait = Histogram()
+        self.room_idle = Histogram()
+        self.phase_times = {}
+        self.phase_calls = {}
+        self._origin = origin
+        self._room_busy = {}
+        self._room_free_since = {}
+
+    def __len__(self):
+        return len(self.events)
+
+    def _record(self, kind, time, procedure_id=None, room=None, value=None):
+        self.counts[kind] += 1
+        self.events.append(Event(kind, time, procedure_id, room, value))
+
+    def arrival(self, time, procedure):
+        self._record(ARRIVAL, time, procedure.procedure_id)
+
+    def queued(self, time, procedure):
+        self._record(QUEUED, time, procedure.procedure_id)
+
+    def start(self, time, procedure, room=None):
+        wait = time - procedure.arrival_time
+        self.queue_wait.add(max(wait, 0))
+        if room is not None:
+            if not self._room_busy.get(room):
+                self.room_idle.add(time - self._room_free_since.get(room, self._origin))
+            self._room_busy[room] = self._room_busy.get(room, 0) + 1
+        self._record(START, time, procedure.procedure_id, room, wait)
+        if self.echo:
+            location = f" in Room {room+1}" if room is not None else ""
+            print(f"Starting {procedure.procedure_name} (ID: {procedure.procedure_id}) with urgency level {procedure.urgency_level} at time {time}{location}")
+
+    def end(self, time, procedure, room=None):
+        if room is not None and self._room_busy.get(room):
+            self._room_busy[room] -= 1
+            if not self._room_busy[room]:
+                self._room_free_since[room] = time
+        self._record(END, time, procedure.procedure_id, room, procedure.duration)
+        if self.echo:
+            print(f"Completed {procedure.procedure_name} (ID: {procedure.procedure_id}) at time {time}")
+
+    def conflict(self, time, procedure, resource):
+        self._record(CONFLICT, time, procedure.procedure_id, None, resource)
+        if self.echo:
+            print(f"Conflict: Procedure {procedure.procedure_id} requires {resource}, but it's not available.")
+
+    def deadlock_fallback(self, time, num_procedures):
+        self._record(DEADLOCK_FALLBACK, time, None, None, num_procedures)
+        if self.echo:
+            print("Deadlock detected! Using alternative priority scheduling...")
+
+    @contextmanager
+    def timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_times[name] = self.phase_times.get(name, 0.0) + time.perf_counter() - start
+            self.phase_calls[name] = self.phase_calls.get(name, 0) + 1
+
+    def of_kind(self, kind):
+        return [event for event in self.events if event.kind == kind]
+
+    def summary(self):
+        return {'counts': dict(self.counts), 'queue_wait': self.queue_wait.to_dict(),
+                'room_idle': self.room_idle.to_dict(),
+                'phases': {name: {'seconds': seconds, 'calls': self.phase_calls[name]}
+                           for name, seconds in self.phase_times.items()}}
+
+
+def timed(log, name):
+    return log.timed(name) if log is not None else nullcontext()
+
+
+def scheduler_hooks(log):
+    # list_schedule callbacks that feed a log; no callbacks at all when logging is off
+    if log is None:
+        return {}
+    return {'on_arrival': lambda procedure, time: log.arrival(time, procedure),
+            'on_start': lambda procedure, time, room: log.start(time, procedure, room),
+            'on_end': lambda procedure, time, room: log.end(time, procedure, room)}
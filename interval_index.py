@@ -0,0 +1,201 @@
+from bisect import bisect_left, bisect_right
+
+
+class IntervalLane:
+    # Non-overlapping [start, end) bookings kept sorted by start; because they never
+    # overlap, the ends are sorted too and every lookup is a bisection.
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.owners = []
+
+    def __len__(self):
+        return len(self.starts)
+
+    def fits(self, start, end):
+        index = bisect_right(self.starts, start)
+        if index and self.ends[index - 1] > start:
+            return False
+        return index == len(self.starts) or self.starts[index] >= end
+
+    def insert(self, start, end, owner):
+        index = bisect_right(self.starts, start)
+        self.starts.insert(index, start)
+        self.ends.insert(index, end)
+        self.owners.insert(index, owner)
+
+    def remove(self, start, owner):
+        index = bisect_left(self.starts, start)
+        while index < len(self.starts) and self.starts[index] == start:
+            if self.owners[index] == owner:
+                del self.starts[index], self.ends[index], self.owners[index]
+                return True
+            index += 1
+        return False
+
+    def holder(self, time):
+        index = bisect_right(self.starts, time) - 1
+        if index >= 0 and self.ends[index] > time:
+            return self.owners[index]
+        return None
+
+    def next_free(self, time, duration=0):
+        index = bisect_right(self.starts, time) - 1
+        if index >= 0 and self.ends[index] > time:
+            time = self.ends[index]
+        index += 1
+        # Only walks forward while back-to-back bookings leave no gap of the requested length
+        while index < len(self.starts) and self.starts[index] < time + duration:
+            time = max(time, self.ends[index])
+            index += 1
+        return time
+
+    def overlapping(self, start, end):
+        first = max(bisect_right(self.starts, start) - 1, 0)
+        owners = []
+        for index in range(first, len(self.starts)):
+            if self.starts[index] >= end:
+                break
+            if self.ends[index] > start:
+                owners.append(self.owners[index])
+        return owners
+
+
+class ResourceIntervals:
+    # One lane per unit of the resource, plus overflow lanes for bookings that no unit lane
+    # can take. A booking over-books the resource when, somewhere in its interval, `units`
+    # bookings across all lanes are already running; the lanes only decide where it is stored,
+    # so out-of-order inserts never hide or invent a conflict.
+    def __init__(self, units=1):
+        self.units = max(units, 1)
+        self.lanes = [IntervalLane() for _ in range(self.units)]
+        self.overflow = []
+
+    def _all_lanes(self):
+        return self.lanes + self.overflow
+
+    def _spans(self, start, end):
+        # Bookings running during [start, end), or at `start` when the window is empty
+        spans = []
+        for lane in self._all_lanes():
+            index = max(bisect_right(lane.starts, start) - 1, 0)
+            while index < len(lane.starts) and (lane.starts[index] < end or lane.starts[index] == start):
+                if lane.ends[index] > start:
+                    spans.append((lane.starts[index], lane.ends[index], lane.owners[index]))
+                index += 1
+        return spans
+
+    @staticmethod
+    def _depth(spans, start, end):
+        # Most bookings running at once within [start, end)
+        events = sorted([(max(first, start), 1) for first, _, _ in spans] +
+                        [(min(last, end), -1) for _, last, _ in spans if last < end])
+        depth = running = 0
+        for _, step in events:
+            running += step
+            depth = max(depth, running)
+        return depth
+
+    def book(self, start, end, owner):
+        spans = self._spans(start, end)
+        clashes = [other for _, _, other in spans] if self._depth(spans, start, end) >= self.units else []
+        for lane in self._all_lanes():
+            if lane.fits(start, end):
+                break
+        else:
+            lane = IntervalLane()
+            self.overflow.append(lane)
+        lane.insert(start, end, owner)
+        return clashes
+
+    def cancel(self, start, owner):
+        for lane in self._all_lanes():
+            if lane.remove(start, owner):
+                return True
+        return False
+
+    def holders(self, time):
+        return [owner for owner in (lane.holder(time) for lane in self._all_lanes()) if owner is not None]
+
+    def next_free(self, time, duration=0):
+        # Earliest time at or after `time` when fewer than `units` bookings run for `duration`.
+        # While the window is full every booking in it is still running, so the next candidate
+        # is the first of their ends.
+        while True:
+            spans = self._spans(time, time + duration)
+            if self._depth(spans, time, time + duration) < self.units:
+                return time
+            time = min(last for _, last, _ in spans)
+
+
+class ConflictIndex:
+    def __init__(self, equipment_units=None, surgeon_units=None):
+        self.units = {}
+        for kind, units in (('equipment', equipment_units), ('surgeon', surgeon_units)):
+            for name, count in (units or {}).items():
+                self.units[(kind, name)] = count
+        self.resources = {}
+        self.conflicts = []
+        self.booked = set()
+
+    def _resource(self, key):
+        if key not in self.resources:
+            self.resources[key] = ResourceIntervals(self.units.get(key, 1))
+        return self.resources[key]
+
+    @staticmethod
+    def resources_of(procedure):
+        keys = []
+        if procedure.equipment:
+            keys.append(('equipment', procedure.equipment))
+        if procedure.surgeon:
+            keys.append(('surgeon', procedure.surgeon))
+        return keys
+
+    def book(self, procedure, start=None, end=None):
+        # Returns (resource, procedure_id, clashing ids) for every resource the booking over-books;
+        # booking the same procedure again is a no-op
+        if procedure.procedure_id in self.booked:
+            return []
+        self.booked.add(procedure.procedure_id)
+        start = procedure.start_time if start is None else start
+        end = start + procedure.duration if end is None else end
+        found = []
+        for key in self.resources_of(procedure):
+            clashes = self._resource(key).book(start, end, procedure.procedure_id)
+            if clashes:
+                found.append((key[1], procedure.procedure_id, clashes))
+        self.conflicts.extend(found)
+        return found
+
+    def cancel(self, procedure, start=None):
+        start = procedure.start_time if start is None else start
+        self.booked.discard(procedure.procedure_id)
+        for key in self.resources_of(procedure):
+            if key in self.resources:
+                self.resources[key].cancel(start, procedure.procedure_id)
+
+    def holders(self, resource, time):
+        key = resource if isinstance(resource, tuple) else self._key(resource)
+        return self.resources[key].holders(time) if key in self.resources else []
+
+    def next_free(self, resource, time, duration=0):
+        key = resource if isinstance(resource, tuple) else self._key(resource)
+        return self.resources[key].next_free(time, duration) if key in self.resources else time
+
+    def _key(self, name):
+        for kind in ('surgeon', 'equipment'):
+            if (kind, name) in self.resources or (kind, name) in self.units:
+                return (kind, name)
+        return ('surgeon', name)
+
+
+def audit_schedule(procedures, equipment_units=None, surgeon_units=None):
+    # Books a finished schedule in start order and returns the index with every conflict found
+    index = ConflictIndex(equipment_units, surgeon_units)
+    scheduled = [procedure for procedure in procedures if procedure.start_time is not None]
+    scheduled.sort(key=lambda procedure: procedure.start_time)
+    for procedure in scheduled:
+        end = procedure.end_time if procedure.end_time is not None else procedure.start_time + procedure.duration
+        index.book(procedure, procedure.start_time, end)
+    return index
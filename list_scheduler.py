@@ -0,0 +1,144 @@
+import heapq
+from collections import defaultdict
+
+
+def priority_key(procedure):
+    return (0 if procedure.urgency_level == 'Emergency' else 1, procedure.arrival_time)
+
+
+def required_resources(procedure, equipment_units, surgeon_units):
+    resources = []
+    if procedure.equipment in equipment_units:
+        resources.append(('equipment', procedure.equipment))
+    if procedure.surgeon in surgeon_units:
+        resources.append(('surgeon', procedure.surgeon))
+    return resources
+
+
+def list_schedule(procedures, num_rooms, equipment_units=None, surgeon_units=None, current_time=0,
+                  on_start=None, on_end=None, on_arrival=None, in_progress=(), priority=None, unscheduled=None):
+    # Event-driven list scheduling: whenever a room frees up or a case arrives, start the
+    # highest-priority waiting procedure whose surgeon and equipment are free. Waiting procedures
+    # are kept in one heap per combination of resources they need, and only the combinations
+    # whose resources all have a free unit are looked at when picking the next case.
+    # in_progress lists (procedure, room) pairs already running at current_time; they hold
+    # their room and resources until their end_time. priority, when given, replaces
+    # priority_key with one sort key per procedure (lower starts first). A procedure that
+    # on_start vetoes waits for the next case to end. Procedures that can never start, vetoed
+    # with nothing left running or needing a resource with no units, are appended to
+    # unscheduled when a list is given.
+    procedures = list(procedures)
+    free = {'equipment': dict(equipment_units or {}), 'surgeon': dict(surgeon_units or {})}
+    needs = [tuple(required_resources(p, free['equipment'], free['surgeon'])) for p in procedures]
+    keys = list(priority) if priority is not None else [priority_key(p) for p in procedures]
+    arrival_times = [p.arrival_time for p in procedures]
+    arrivals = sorted(range(len(procedures)), key=arrival_times.__getitem__)
+    next_arrival = 0
+
+    running = []
+    busy_rooms = set()
+    for procedure, room in in_progress:
+        i = len(procedures)
+        procedures.append(procedure)
+        needs.append(tuple(required_resources(procedure, free['equipment'], free['surgeon'])))
+        for kind, name in needs[i]:
+            free[kind][name] -= 1
+        busy_rooms.add(room)
+        running.append((procedure.end_time, i, room))
+    heapq.heapify(running)
+
+    free_rooms = [room for room in range(num_rooms) if room not in busy_rooms]
+    heapq.heapify(free_rooms)
+    waiting = {need: [] for need in set(needs[:len(keys)])}
+    users = defaultdict(list)
+    for need in waiting:
+        for resource in need:
+            users[resource].append(need)
+    busy_count = {need: sum(free[kind][name] <= 0 for kind, name in need) for need in waiting}
+    open_needs = {need for need, count in busy_count.items() if count == 0}
+    vetoed = []
+    schedule = []
+    now = current_time
+
+    while True:
+        while next_arrival < len(arrivals) and arrival_times[arrivals[next_arrival]] <= now:
+            i = arrivals[next_arrival]
+            heapq.heappush(waiting[needs[i]], (keys[i], i))
+            next_arrival += 1
+            if on_arrival is not None:
+                on_arrival(procedures[i], arrival_times[i])
+
+        while free_rooms:
+            best = best_entry = None
+            for need in open_needs:
+                queue = waiting[need]
+                if queue and (best_entry is None or queue[0] < best_entry):
+                    best, best_entry = need, queue[0]
+            if best is None:
+                break
+            key, i = heapq.heappop(waiting[best])
+            procedure = procedures[i]
+            if on_start is not None and on_start(procedure, now, free_rooms[0]) is False:
+                vetoed.append((key, i))
+                continue
+            room = heapq.heappop(free_rooms)
+            for kind, name in needs[i]:
+                free[kind][name] -= 1
+                if free[kind][name] == 0:
+                    for need in users[(kind, name)]:
+                        busy_count[need] += 1
+                        open_needs.discard(need)
+            procedure.start_time = now
+            procedure.end_time = now + procedure.duration
+            heapq.heappush(running, (procedure.end_time, i, room))
+            schedule.append((procedure, room))
+
+        candidates = []
+        if running:
+            candidates.append(running[0][0])
+        if next_arrival < len(arrivals):
+            candidates.append(max(now, arrival_times[arrivals[next_arrival]]))
+        if not candidates:
+            if unscheduled is not None:
+                left = vetoed + [entry for queue in waiting.values() for entry in queue]
+                unscheduled.extend(procedures[j] for _, j in sorted(left))
+            break
+        now = min(candidates)
+
+        while running and running[0][0] <= now:
+            end, i, room = heapq.heappop(running)
+            heapq.heappush(free_rooms, room)
+            for kind, name in needs[i]:
+                free[kind][name] += 1
+                if free[kind][name] == 1:
+                    for need in users[(kind, name)]:
+                        busy_count[need] -= 1
+                        if busy_count[need] == 0:
+                            open_needs.add(need)
+            if on_end is not None:
+                on_end(procedures[i], end, room)
+            for key, j in vetoed:
+                heapq.heappush(waiting[needs[j]], (key, j))
+            vetoed.clear()
+
+    return schedule
+
+
+def replan_from(procedures, rooms, since, num_rooms, equipment_units=None, surgeon_units=None, **hooks):
+    # List scheduling decides each start from what has happened up to that moment, so the
+    # part of a plan that starts before `since` stays valid however the rest changes.
+    # procedures carry their previous start/end times (None when not planned yet) and rooms
+    # maps procedure_id to the room of that plan; only the tail from `since` is re-planned.
+    in_progress = []
+    pending = []
+    for procedure in procedures:
+        if procedure.start_time is not None and procedure.start_time < since:
+            if procedure.end_time > since:
+                in_progress.append((procedure, rooms[procedure.procedure_id]))
+        else:
+            pending.append(procedure)
+    return list_schedule(pending, num_rooms, equipment_units, surgeon_units, since, in_progress=in_progress, **hooks)
+
+
+def makespan(schedule):
+    return max((procedure.end_time for procedure, _ in schedule), default=0)
@@ -0,0 +1,165 @@
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import Code
+from list_scheduler import list_schedule, priority_key
+
+OBJECTIVE_WEIGHTS = {'makespan': 1.0, 'emergency_delay': 5.0, 'room_idle': 0.5}
+ROUND_TIME = 0.5
+
+
+def _cases(procedures):
+    # Plain tuples cross process boundaries cheaply and rebuild into fresh procedures
+    return [(p.procedure_id, p.urgency_level, p.procedure_name, p.equipment, p.surgeon, p.arrival_time, p.duration)
+            for p in procedures]
+
+
+def _decode(procedures, order, num_rooms, equipment_units, surgeon_units):
+    # order is a permutation of procedure indices; earlier means higher priority whenever a
+    # room and the case's resources are free, so every order decodes to a feasible schedule
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[np.asarray(order, dtype=np.int64)] = np.arange(len(order))
+    return list_schedule(procedures, num_rooms, equipment_units, surgeon_units, priority=rank.tolist())
+
+
+def schedule_cost(schedule, num_rooms, weights=OBJECTIVE_WEIGHTS):
+    if not schedule:
+        return 0.0, dict.fromkeys(OBJECTIVE_WEIGHTS, 0.0)
+    makespan = max(procedure.end_time for procedure, _ in schedule)
+    emergency_waits = [procedure.start_time - procedure.arrival_time for procedure, _ in schedule
+                       if procedure.urgency_level == 'Emergency']
+    first_start, last_end, busy = {}, {}, {}
+    for procedure, room in schedule:
+        first_start[room] = min(first_start.get(room, procedure.start_time), procedure.start_time)
+        last_end[room] = max(last_end.get(room, procedure.end_time), procedure.end_time)
+        busy[room] = busy.get(room, 0.0) + procedure.duration
+    # Idle time counts the gaps between a room's first and last case
+    room_idle = sum(last_end[room] - first_start[room] - busy[room] for room in busy)
+    terms = {'makespan': makespan,
+             'emergency_delay': sum(emergency_waits) / len(emergency_waits) if emergency_waits else 0.0,
+             'room_idle': room_idle}
+    return sum(weights[name] * value for name, value in terms.items()), terms
+
+
+def initial_order(procedures):
+    return sorted(range(len(procedures)), key=lambda i: (priority_key(procedures[i]), i))
+
+
+def _neighbour(order, rng):
+    order = list(order)
+    n = len(order)
+    move = rng.random()
+    if move < 0.4:
+        i, j = rng.randrange(n), rng.randrange(n)
+        order[i], order[j] = order[j], order[i]
+    elif move < 0.8:
+        i, j = rng.randrange(n), rng.randrange(n)
+        order.insert(j, order.pop(i))
+    else:
+        # Large-neighbourhood move: shuffle a short window of consecutive priorities
+        width = min(n, rng.randint(3, 8))
+        start = rng.randrange(n - width + 1)
+        window = order[start:start + width]
+        rng.shuffle(window)
+        order[start:start + width] = window
+    return order
+
+
+def local_search(cases, order, num_rooms, equipment_units, surgeon_units, deadline, seed, weights=OBJECTIVE_WEIGHTS):
+    # Late-acceptance hill climbing: a candidate is kept when it beats either the current
+    # order or the cost from a fixed number of steps ago, which lets the search drift
+    # across plateaus without a temperature schedule.
+    rng = random.Random(seed)
+    procedures = [Code.SurgicalProcedure(*case) for case in cases]
+    current = list(order)
+    current_cost = schedule_cost(_decode(procedures, current, num_rooms, equipment_units, surgeon_units),
+                                 num_rooms, weights)[0]
+    best, best_cost = current, current_cost
+    history = [current_cost] * 50
+    step = 0
+    while len(current) > 1 and time.perf_counter() < deadline:
+        candidate = _neighbour(current, rng)
+        cost = schedule_cost(_decode(procedures, candidate, num_rooms, equipment_units, surgeon_units),
+                             num_rooms, weights)[0]
+        slot = step % len(history)
+        if cost <= current_cost or cost < history[slot]:
+            current, current_cost = candidate, cost
+            if cost < best_cost:
+                best, best_cost = candidate, cost
+        history[slot] = current_cost
+        step += 1
+    return best_cost, best, step
+
+
+def optimize_schedule(procedures, num_rooms=Code.NUM_OPERATING_ROOMS, equipment_units=None, surgeon_units=None,
+                      budget=5.0, workers=None, seed=0, weights=OBJECTIVE_WEIGHTS, round_time=ROUND_TIME,
+                      on_improvement=None):
+    # Anytime search: every round, each worker climbs from the best order found so far with
+    # its own seed, and the round's winner seeds the next round. Stopping early (budget
+    # spent or Ctrl-C) still returns the best schedule seen.
+    procedures = list(procedures)
+    equipment_units = dict(Code.equipment_units() if equipment_units is None else equipment_units)
+    surgeon_units = dict(Code.surgeon_units() if surgeon_units is None else surgeon_units)
+    cases = _cases(procedures)
+    best = initial_order(procedures)
+    best_cost = schedule_cost(_decode(procedures, best, num_rooms, equipment_units, surgeon_units), num_rooms, weights)[0]
+    evaluations = 0
+    workers = workers or os.cpu_count() or 1
+    deadline = time.perf_counter() + budget
+    seeds = np.random.SeedSequence(seed)
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        while time.perf_counter() < deadline and len(procedures) > 1:
+            round_deadline = min(deadline, time.perf_counter() + round_time)
+            round_seeds = [int(child.generate_state(1)[0]) for child in seeds.spawn(workers)]
+            if executor is None:
+                results = [local_search(cases, best, num_rooms, equipment_units, surgeon_units, round_deadline,
+                                        round_seeds[0], weights)]
+            else:
+                futures = [executor.submit(local_search, cases, best, num_rooms, equipment_units, surgeon_units,
+                                           round_deadline, worker_seed, weights) for worker_seed in round_seeds]
+                results = [future.result() for future in futures]
+            evaluations += sum(steps for _, _, steps in results)
+            cost, order, _ = min(results, key=lambda result: result[0])
+            if cost < best_cost:
+                best, best_cost = order, cost
+                if on_improvement is not None:
+                    on_improvement(best_cost, time.perf_counter() - deadline + budget)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    schedule = _decode(procedures, best, num_rooms, equipment_units, surgeon_units)
+    cost, terms = schedule_cost(schedule, num_rooms, weights)
+    return schedule, {'cost': cost, 'evaluations': evaluations, **terms}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Improve the priority schedule with parallel local search.")
+    parser.add_argument('procedures', type=int)
+    parser.add_argument('--budget', type=float, default=5.0, help="wall-clock seconds to search")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--rooms', type=int, default=Code.NUM_OPERATING_ROOMS)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    procedures = Code.create_procedures(args.procedures)
+    baseline = schedule_cost(list_schedule(procedures, args.rooms, Code.equipment_units(), Code.surgeon_units()),
+                             args.rooms)
+    print(f"priority schedule: cost {baseline[0]:.3f} " + " ".join(f"{k}={v:.3f}" for k, v in baseline[1].items()))
+    _, summary = optimize_schedule(procedures, args.rooms, budget=args.budget, workers=args.workers, seed=args.seed,
+                                   on_improvement=lambda cost, elapsed: print(f"{elapsed:7.2f}s  cost {cost:.3f}"))
+    print(f"optimized schedule: cost {summary['cost']:.3f} evaluations {summary['evaluations']} "
+          + " ".join(f"{k}={summary[k]:.3f}" for k in OBJECTIVE_WEIGHTS))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,16 @@
-import pandas as pd
+import os
 import simpy
 import random
-import matplotlib.pyplot as plt
+from instrumentation import EventLog
+from interval_index import ConflictIndex
+from procedure_io import iter_procedure_batches, write_procedures_csv
+from procedure_table import ProcedureTable
+from rendering import render_charts, render_gantt
+from timeline import ResourceTimeline
 
 NUM_OPERATING_ROOMS = 2
 SIMULATION_TIME = 480
+TRACKING_MODES = ['events', 'polling']
 
 urgency_levels = ['Normal', 'Emergency']
 procedure_names = ['Appendectomy', 'Cholecystectomy', 'Hysterectomy', 'Laparoscopy', 'Prostatectomy']
@@ -12,6 +18,9 @@ available_equipment = ['Laparoscope', 'Endoscope', 'Microscope', 'Ultrasound']
 surgeon_names = ['Dr. Smith', 'Dr. Johnson', 'Dr. Brown', 'Dr. Davis', 'Dr. Garcia']
 
 class SurgicalProcedure:
+    __slots__ = ('procedure_id', 'urgency_level', 'procedure_name', 'equipment', 'surgeon',
+                 'arrival_time', 'duration', 'start_time', 'end_time')
+
     def __init__(self, procedure_id, urgency_level, procedure_name, equipment, surgeon, arrival_time, duration):
         self.procedure_id = procedure_id
         self.urgency_level = urgency_level
@@ -23,193 +32,200 @@ class SurgicalProcedure:
         self.start_time = None
         self.end_time = None
 
+class ResourceTracker:
+    def __init__(self, resource_allocation, num_rooms=NUM_OPERATING_ROOMS, equipment_units=None, surgeon_units=None):
+        self.resource_allocation = resource_allocation
+        self.rooms_available = num_rooms
+        self.equipment_available = dict({equip: 1 for equip in available_equipment} if equipment_units is None else equipment_units)
+        self.surgeons_available = dict({doctor: 1 for doctor in surgeon_names} if surgeon_units is None else surgeon_units)
+        self.bookings = ConflictIndex(self.equipment_available, self.surgeons_available)
+
+    def record_initial(self, now):
+        for room in self.resource_allocation['rooms']:
+            self.resource_allocation['rooms'][room].record(now, self.rooms_available)
+        for equip, count in self.equipment_available.items():
+            self.resource_allocation['equipment'][equip].record(now, count)
+        for doctor, count in self.surgeons_available.items():
+            self.resource_allocation['doctors'][doctor].record(now, count)
+
+    def acquire(self, now, procedure, room_id):
+        self._change(now, procedure, room_id, -1)
+        return self.bookings.book(procedure, now)
+
+    def release(self, now, procedure, room_id):
+        self._change(now, procedure, room_id, 1)
+
+    def _change(self, now, procedure, room_id, delta):
+        self.rooms_available += delta
+        self.resource_allocation['rooms'][f'Room {room_id+1}'].record(now, self.rooms_available)
+        if procedure.equipment in self.equipment_available:
+            self.equipment_available[procedure.equipment] += delta
+            self.resource_allocation['equipment'][procedure.equipment].record(now, self.equipment_available[procedure.equipment])
+        if procedure.surgeon in self.surgeons_available:
+            self.surgeons_available[procedure.surgeon] += delta
+            self.resource_allocation['doctors'][procedure.surgeon].record(now, self.surgeons_available[procedure.surgeon])
+
+def new_resource_allocation(num_rooms=NUM_OPERATING_ROOMS, equipment=None, surgeons=None):
+    # Every room records the suite-wide count of free rooms, so the rooms share one timeline
+    rooms_timeline = ResourceTimeline()
+    return {'rooms': {f'Room {i+1}': rooms_timeline for i in range(num_rooms)},
+            'equipment': {equip: ResourceTimeline() for equip in (available_equipment if equipment is None else equipment)},
+            'doctors': {doctor: ResourceTimeline() for doctor in (surgeon_names if surgeons is None else surgeons)}}
+
 def load_dataset(filename):
     try:
-        df = pd.read_csv(filename)
+        return ProcedureTable.read_csv(filename)
     except FileNotFoundError:
         return []
-    procedures = []
-    for _, row in df.iterrows():
-        procedure = SurgicalProcedure(row['id'], row['urgency_level'], row['procedure_name'],
-                                      row['equipment'], row['surgeon'], row['arrival_time'], row['duration'])
-        procedures.append(procedure)
-    return procedures
 
-def schedule_surgeries(env, procedures, room_resources, resource_allocation):
+def schedule_surgeries(env, procedures, room_resources, resource_allocation, tracker=None, rng=random, log=None,
+                       num_rooms=NUM_OPERATING_ROOMS, closing_time=None):
     emergency_procedures = [procedure for procedure in procedures if procedure.urgency_level == 'Emergency']
     elective_procedures = [procedure for procedure in procedures if procedure.urgency_level != 'Emergency']
+    # Room each case is booked into, by procedure_id, for the Gantt chart's per-room rows
+    room_ids = {}
     
     for procedure in emergency_procedures:
-        room_id = random.randint(0, NUM_OPERATING_ROOMS - 1)
-        env.process(surgery_process(env, procedure, room_resources, resource_allocation, room_id))
+        room_id = rng.randint(0, num_rooms - 1)
+        room_ids[procedure.procedure_id] = room_id
+        env.process(surgery_process(env, procedure, room_resources, resource_allocation, room_id, tracker, log, closing_time))
         
     for procedure in elective_procedures:
-        room_id = random.randint(0, NUM_OPERATING_ROOMS - 1)
-        env.process(surgery_process(env, procedure, room_resources, resource_allocation, room_id))
-
-def surgery_process(env, procedure, room_resources, resource_allocation, room_id):
-    yield env.timeout(procedure.arrival_time)
-    procedure.start_time = env.now
-    print(f"Starting {procedure.procedure_name} (ID: {procedure.procedure_id}) with urgency level {procedure.urgency_level} at time {env.now}")
-    with room_resources.request(priority=1 if procedure.urgency_level == 'Emergency' else 0) as request:
+        room_id = rng.randint(0, num_rooms - 1)
+        room_ids[procedure.procedure_id] = room_id
+        env.process(surgery_process(env, procedure, room_resources, resource_allocation, room_id, tracker, log, closing_time))
+    return room_ids
+
+def stream_surgeries(env, batches, room_resources, resource_allocation, tracker=None, log=None):
+    # Batches are expected in arrival order; each one is only read once the clock reaches it
+    for batch in batches:
+        if len(batch) == 0:
+            continue
+        first_arrival = batch.column('arrival_time').min()
+        if first_arrival > env.now:
+            yield env.timeout(first_arrival - env.now)
+        schedule_surgeries(env, batch, room_resources, resource_allocation, tracker, log=log)
+
+def surgery_process(env, procedure, room_resources, resource_allocation, room_id, tracker=None, log=None, closing_time=None):
+    if procedure.arrival_time > env.now:
+        yield env.timeout(procedure.arrival_time - env.now)
+    if log is not None:
+        log.arrival(env.now, procedure)
+    with room_resources.request(priority=0 if procedure.urgency_level == 'Emergency' else 1) as request:
+        if log is not None and not request.triggered:
+            log.queued(env.now, procedure)
         yield request
-        # Update resource allocation for rooms
-        resource_allocation['rooms'][f'Room {room_id+1}'].append((env.now, 1))  # Example: Increment room availability by 1
+        # A case that only gets a room after closing is not started; it stays unscheduled
+        if closing_time is not None and env.now >= closing_time:
+            return
+        procedure.start_time = env.now
+        if log is not None:
+            log.start(env.now, procedure, room_id)
+        # Post the acquire/release events so occupancy only changes when a surgery starts or ends
+        if tracker is not None:
+            for resource, _, _ in tracker.acquire(env.now, procedure, room_id):
+                if log is not None:
+                    log.conflict(env.now, procedure, resource)
         yield env.timeout(procedure.duration)
     procedure.end_time = env.now
-    print(f"Completed {procedure.procedure_name} (ID: {procedure.procedure_id}) at time {env.now}")
+    if tracker is not None:
+        tracker.release(env.now, procedure, room_id)
+    if log is not None:
+        log.end(env.now, procedure, room_id)
 
-def save_procedures_to_csv(procedures):
-    df = pd.DataFrame([vars(p) for p in procedures])
-    df.to_csv("D:\\Btech_AI\\4thsem\\OS\\Project\\procedures.csv", index=False)
+def save_procedures_to_csv(procedures, filename="procedures.csv"):
+    write_procedures_csv(procedures, filename)
 
-def create_procedures(num_procedures):
-    procedures = []
+def create_procedures(num_procedures, output_path="procedures.csv", rng=random):
+    columns = {name: [] for name in ('urgency_level', 'procedure_name', 'equipment', 'surgeon', 'arrival_time', 'duration')}
     for i in range(num_procedures):
-        procedure_id = i
-        urgency_level = 'Emergency' if random.random() < 0.3 else 'Normal'  # 30% chance for Emergency
-        procedure_name = random.choice(procedure_names)
-        equipment = random.choice(available_equipment) if random.random() < 0.5 else None
-        surgeon = random.choice(surgeon_names) if random.random() < 0.5 else None
-        arrival_time = random.randint(0, 20)
-        duration = random.uniform(1, 5)
-        procedure = SurgicalProcedure(procedure_id, urgency_level, procedure_name, equipment, surgeon, arrival_time, duration)
-        procedures.append(procedure)
-    
-    save_procedures_to_csv(procedures)
+        columns['urgency_level'].append('Emergency' if rng.random() < 0.3 else 'Normal')  # 30% chance for Emergency
+        columns['procedure_name'].append(rng.choice(procedure_names))
+        columns['equipment'].append(rng.choice(available_equipment) if rng.random() < 0.5 else None)
+        columns['surgeon'].append(rng.choice(surgeon_names) if rng.random() < 0.5 else None)
+        columns['arrival_time'].append(rng.randint(0, 20))
+        columns['duration'].append(rng.uniform(1, 5))
+    procedures = ProcedureTable.from_columns(range(num_procedures), **columns)
+
+    if output_path is not None:
+        save_procedures_to_csv(procedures, output_path)
     return procedures
 
-def plot_gantt_chart(procedures):
-    fig, ax = plt.subplots(figsize=(10, len(procedures) * 0.5))
-    for i, procedure in enumerate(procedures):
-        if procedure.start_time is not None and procedure.end_time is not None:
-            duration = procedure.end_time - procedure.start_time
-            ax.barh(i, duration, left=procedure.start_time, color='blue', alpha=0.7, edgecolor='black')
-            ax.text(procedure.start_time + 5, i, f"{procedure.procedure_name} (ID: {procedure.procedure_id})",
-                    verticalalignment='center', fontsize=8)
-            ax.text(procedure.start_time + 5, i + 0.2, f"Surgeon: {procedure.surgeon}",
-                    verticalalignment='center', fontsize=6)
-            ax.text(procedure.start_time + 5, i - 0.2, f"Urgency: {procedure.urgency_level}",
-                    verticalalignment='center', fontsize=6)
-    ax.set_xlabel('Time (minutes)')
-    ax.set_ylabel('Procedures')
-    ax.set_title('Surgical Procedures Gantt Chart')
-    ax.set_yticks(range(len(procedures)))
-    ax.set_yticklabels([f"{procedure.procedure_name} (ID: {procedure.procedure_id})" for procedure in procedures])
-    ax.grid(True)
-    plt.show()
-
-def plot_charts(resource_allocation):
-    fig, axs = plt.subplots(nrows=3, ncols=1, figsize=(12, 18), sharex=True)
-
-    # Plot resource allocation graph for rooms
-    room_data = []
-    for sub_resource_name, sub_allocation_data in resource_allocation['rooms'].items():
-        if isinstance(sub_allocation_data, list):
-            if sub_allocation_data:
-                room_data.extend(sub_allocation_data)
-
-    times, availability = zip(*room_data)
-    axs[0].step(times, availability, where='post', label='Room Availability')
-
-    axs[0].set_title('Room Allocation Over Time', fontsize=14)
-    axs[0].set_ylabel('Number of Available Rooms', fontsize=12)
-    axs[0].legend(fontsize=12, loc='upper right')
-    axs[0].grid(True)
-    axs[0].set_ylim(0, NUM_OPERATING_ROOMS)  # Set y-axis limits
-
-    # Plot resource allocation graph for equipment
-    for sub_resource_name, sub_allocation_data in resource_allocation['equipment'].items():
-        if isinstance(sub_allocation_data, list):
-            if sub_allocation_data:
-                times = range(len(sub_allocation_data))
-                axs[1].step(times, sub_allocation_data, where='post', label=sub_resource_name)
-
-    axs[1].set_title('Equipment Allocation Over Time', fontsize=14)
-    axs[1].set_ylabel('Number of Available Equipment', fontsize=12)
-    axs[1].legend(fontsize=12, loc='upper right')
-    axs[1].grid(True)
-    axs[1].set_ylim(0, len(available_equipment))  # Set y-axis limits
-
-    # Plot resource allocation graph for doctors
-    for sub_resource_name, sub_allocation_data in resource_allocation['doctors'].items():
-        if isinstance(sub_allocation_data, list):
-            if sub_allocation_data:
-                times = range(len(sub_allocation_data))
-                axs[2].step(times, sub_allocation_data, where='post', label=sub_resource_name)
-
-    axs[2].set_title('Doctor Allocation Over Time', fontsize=14)
-    axs[2].set_ylabel('Number of Available Doctors', fontsize=12)
-    axs[2].legend(fontsize=12, loc='upper right')
-    axs[2].grid(True)
-    axs[2].set_ylim(0, len(surgeon_names))  # Set y-axis limits
-
-    plt.subplots_adjust(hspace=0.5)  # Increase vertical spacing between subplots
-
-    # Set shared x-axis label and adjust tick label format
-    fig.supxlabel('Time (minutes)', fontsize=14)
-    for ax in axs:
-        ax.xaxis.set_major_formatter(plt.FuncFormatter(lambda x, _: f"{int(x):03d}"))
-
-    plt.tight_layout()
-    plt.show()
-def room_process(env, room_resources, resource_allocation, procedures, room_id):
+def plot_gantt_chart(procedures, output_path=None, rooms=None):
+    return render_gantt(procedures, output_path, rooms)
+
+def plot_charts(resource_allocation, output_path=None):
+    return render_charts(resource_allocation, NUM_OPERATING_ROOMS, len(available_equipment), len(surgeon_names), output_path)
+def room_process(env, room_resources, resource_allocation, procedures, room_id, log=None, bookings=None):
     while True:
         yield env.timeout(1)
-        procedures_in_room = [p for p in procedures if p.start_time is not None and p.end_time is not None and p.start_time <= env.now <= p.end_time]
+        procedures_in_room = [p for p in procedures if p.start_time is not None and p.start_time <= env.now and
+                              (p.end_time is None or env.now < p.end_time)]
         num_procedures_in_room = len(procedures_in_room)
-        resource_allocation['rooms'][f'Room {room_id+1}'].append((env.now, NUM_OPERATING_ROOMS - num_procedures_in_room))
-
-        # Update equipment allocation
-        equipment_usage = {}
-        for equip in available_equipment:
-            procedures_using_equip = [p for p in procedures_in_room if p.equipment == equip]
-            num_available = len([p for p in procedures if p.equipment != equip])
-            resource_allocation['equipment'][equip].append(num_available)
-            equipment_usage[equip] = procedures_using_equip
-
-        # Update doctor allocation
-        doctor_usage = {}
-        for doctor in surgeon_names:
-            procedures_with_doctor = [p for p in procedures_in_room if p.surgeon == doctor]
-            num_available = len([p for p in procedures if p.surgeon != doctor])
-            resource_allocation['doctors'][doctor].append(num_available)
-            doctor_usage[doctor] = procedures_with_doctor
-
-        # Handle resource conflicts
+        resource_allocation['rooms'][f'Room {room_id+1}'].record(env.now, NUM_OPERATING_ROOMS - num_procedures_in_room)
+
+        # Count equipment and doctor usage in one pass instead of one list per resource
+        equipment_usage = dict.fromkeys(available_equipment, 0)
+        doctor_usage = dict.fromkeys(surgeon_names, 0)
+        for procedure in procedures_in_room:
+            if procedure.equipment in equipment_usage:
+                equipment_usage[procedure.equipment] += 1
+            if procedure.surgeon in doctor_usage:
+                doctor_usage[procedure.surgeon] += 1
+        for equip, count in equipment_usage.items():
+            resource_allocation['equipment'][equip].record(env.now, 1 - count)
+        for doctor, count in doctor_usage.items():
+            resource_allocation['doctors'][doctor].record(env.now, 1 - count)
+
+        # Handle resource conflicts: each case is booked into the shared interval index once,
+        # which flags it if its surgeon or equipment is already held for an overlapping slot
+        if bookings is None:
+            continue
         for procedure in procedures_in_room:
-            if procedure.equipment and procedure.equipment not in equipment_usage:
-                print(f"Conflict: Procedure {procedure.procedure_id} requires {procedure.equipment}, but it's not available.")
-            if procedure.surgeon and procedure.surgeon not in doctor_usage:
-                print(f"Conflict: Procedure {procedure.procedure_id} requires {procedure.surgeon}, but they're not available.")
-
-        # Update resource usage duration
-        for equip, procedures_using_equip in equipment_usage.items():
-            for proc in procedures_using_equip:
-                if proc.start_time is not None and proc.end_time is None:
-                    proc.end_time = env.now + proc.duration  # Set the end time based on the procedure duration
-
-        for doctor, procedures_with_doctor in doctor_usage.items():
-            for proc in procedures_with_doctor:
-                if proc.start_time is not None and proc.end_time is None:
-                    proc.end_time = env.now + proc.duration  # Set the end time based on the procedure duration
-def main():
+            for resource, _, _ in bookings.book(procedure):
+                if log is not None:
+                    log.conflict(env.now, procedure, resource)
+
+def simulate_dataset(filename, chunk_size=100_000, until=SIMULATION_TIME, log=None):
+    env = simpy.Environment()
+    room_resources = simpy.PriorityResource(env, capacity=NUM_OPERATING_ROOMS)
+    resource_allocation = new_resource_allocation()
+    tracker = ResourceTracker(resource_allocation)
+    tracker.record_initial(env.now)
+    env.process(stream_surgeries(env, iter_procedure_batches(filename, chunk_size), room_resources, resource_allocation, tracker, log))
+    env.run(until=until)
+    return resource_allocation
+
+def main(tracking='events', output_dir=None, echo=True):
+    if tracking not in TRACKING_MODES:
+        raise ValueError(f"Unknown tracking mode: {tracking}")
+    log = EventLog(echo=echo)
     num_procedures = int(input("Enter number of procedures: "))
     procedures = create_procedures(num_procedures)
     env = simpy.Environment()
     room_resources = simpy.PriorityResource(env, capacity=NUM_OPERATING_ROOMS)
-    resource_allocation = {'rooms': {f'Room {i+1}':[] for i in range(NUM_OPERATING_ROOMS)},
-                           'equipment': {equip: [] for equip in available_equipment},
-                           'doctors': {doctor: [] for doctor in surgeon_names}}
-
-    for i in range(NUM_OPERATING_ROOMS):
-        env.process(room_process(env, room_resources, resource_allocation, procedures, i))
-
-    schedule_surgeries(env, procedures, room_resources, resource_allocation)
+    resource_allocation = new_resource_allocation()
+
+    tracker = None
+    if tracking == 'events':
+        tracker = ResourceTracker(resource_allocation)
+        tracker.record_initial(env.now)
+    else:
+        bookings = ConflictIndex()
+        for i in range(NUM_OPERATING_ROOMS):
+            env.process(room_process(env, room_resources, resource_allocation, procedures, i, log, bookings))
+
+    room_ids = schedule_surgeries(env, procedures, room_resources, resource_allocation, tracker, log=log)
     env.run(until=SIMULATION_TIME)
-
-    plot_gantt_chart(procedures)
-    plot_charts(resource_allocation)
+    rooms = [room_ids[procedure_id] for procedure_id in procedures.column('procedure_id')]
+
+    if output_dir is None:
+        plot_gantt_chart(procedures, rooms=rooms)
+        plot_charts(resource_allocation)
+    else:
+        plot_gantt_chart(procedures, os.path.join(output_dir, 'gantt.png'), rooms)
+        plot_charts(resource_allocation, os.path.join(output_dir, 'allocation.png'))
+    return log
 
 if __name__ == "__main__":
     main()
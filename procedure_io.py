@@ -0,0 +1,100 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from procedure_table import CATEGORICAL_COLUMNS, NUMERIC_COLUMNS, ProcedureTable
+
+DEFAULT_CHUNK_SIZE = 100_000
+BINARY_META_FILE = 'meta.json'
+
+
+def iter_procedure_batches(filename, chunk_size=DEFAULT_CHUNK_SIZE):
+    dtypes = {name: 'category' for name in CATEGORICAL_COLUMNS}
+    with pd.read_csv(filename, dtype=dtypes, chunksize=chunk_size, float_precision='round_trip') as reader:
+        for chunk in reader:
+            yield ProcedureTable.from_dataframe(chunk)
+
+
+def iter_table_chunks(procedures, chunk_size=DEFAULT_CHUNK_SIZE):
+    procedures = ProcedureTable.from_procedures(procedures)
+    for start in range(0, len(procedures), chunk_size):
+        yield procedures.slice(start, start + chunk_size)
+
+
+def write_procedures_csv(batches, filename, chunk_size=DEFAULT_CHUNK_SIZE):
+    if isinstance(batches, (ProcedureTable, list)):
+        batches = iter_table_chunks(batches, chunk_size)
+    written = 0
+    for batch in batches:
+        batch.to_dataframe().to_csv(filename, mode='w' if written == 0 else 'a', header=written == 0, index=False)
+        written += len(batch)
+    if written == 0:
+        ProcedureTable().to_dataframe().to_csv(filename, index=False)
+    return written
+
+
+def write_procedures_binary(batches, directory, chunk_size=DEFAULT_CHUNK_SIZE):
+    # One raw file per column plus a small JSON header, so the whole dataset can be
+    # memory-mapped back without parsing. Category codes are remapped chunk by chunk
+    # onto one global category list.
+    if isinstance(batches, (ProcedureTable, list)):
+        batches = iter_table_chunks(batches, chunk_size)
+    os.makedirs(directory, exist_ok=True)
+    categories = {name: [] for name in CATEGORICAL_COLUMNS}
+    lookup = {name: {} for name in CATEGORICAL_COLUMNS}
+    files = {name: open(os.path.join(directory, f'{name}.bin'), 'wb')
+             for name in list(NUMERIC_COLUMNS) + CATEGORICAL_COLUMNS}
+    size = 0
+    try:
+        for batch in batches:
+            for name in NUMERIC_COLUMNS:
+                files[name].write(batch.column(name).tobytes())
+            for name in CATEGORICAL_COLUMNS:
+                remap = np.empty(len(batch.categories[name]) + 1, dtype=np.int16)
+                remap[-1] = -1
+                for code, value in enumerate(batch.categories[name]):
+                    if value not in lookup[name]:
+                        lookup[name][value] = len(categories[name])
+                        categories[name].append(value)
+                    remap[code] = lookup[name][value]
+                files[name].write(remap[batch.codes[name]].tobytes())
+            size += len(batch)
+    finally:
+        for handle in files.values():
+            handle.close()
+    meta = {'size': size,
+            'numeric': {name: np.dtype(dtype).str for name, dtype in NUMERIC_COLUMNS.items()},
+            'categories': categories}
+    with open(os.path.join(directory, BINARY_META_FILE), 'w') as handle:
+        json.dump(meta, handle)
+    return size
+
+
+def load_procedures_binary(directory, mmap=True):
+    with open(os.path.join(directory, BINARY_META_FILE)) as handle:
+        meta = json.load(handle)
+    size = meta['size']
+
+    def column(name, dtype):
+        path = os.path.join(directory, f'{name}.bin')
+        if size == 0:
+            return np.zeros(0, dtype=dtype)
+        if mmap:
+            # Copy-on-write keeps the file untouched when schedulers fill in start/end times
+            return np.memmap(path, dtype=dtype, mode='c', shape=(size,))
+        return np.fromfile(path, dtype=dtype, count=size)
+
+    columns = {name: column(name, np.dtype(dtype)) for name, dtype in meta['numeric'].items()}
+    codes = {name: column(name, np.int16) for name in CATEGORICAL_COLUMNS}
+    return ProcedureTable.from_arrays(columns, codes, meta['categories'])
+
+
+def load_procedures_cached(filename, cache_directory=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    if cache_directory is None:
+        cache_directory = os.path.splitext(filename)[0] + '.procedures'
+    meta_path = os.path.join(cache_directory, BINARY_META_FILE)
+    if not os.path.exists(meta_path) or os.path.getmtime(meta_path) < os.path.getmtime(filename):
+        write_procedures_binary(iter_procedure_batches(filename, chunk_size), cache_directory)
+    return load_procedures_binary(cache_directory)
@@ -0,0 +1,216 @@
+import numpy as np
+import pandas as pd
+
+NUMERIC_COLUMNS = {'procedure_id': np.int64, 'arrival_time': np.float64, 'duration': np.float64,
+                   'start_time': np.float64, 'end_time': np.float64}
+CATEGORICAL_COLUMNS = ['urgency_level', 'procedure_name', 'equipment', 'surgeon']
+COLUMNS = ['procedure_id', 'urgency_level', 'procedure_name', 'equipment', 'surgeon',
+           'arrival_time', 'duration', 'start_time', 'end_time']
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and value != value)
+
+
+class ProcedureView:
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    def __eq__(self, other):
+        return isinstance(other, ProcedureView) and other.table is self.table and other.index == self.index
+
+    def __hash__(self):
+        return hash((id(self.table), self.index))
+
+    def __repr__(self):
+        return f"ProcedureView({self.procedure_name!r}, ID: {self.procedure_id})"
+
+
+def _factorize(values):
+    if isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+        categorical = pd.Categorical(values)
+        return categorical.codes, list(categorical.categories)
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=True)
+    return codes, list(uniques)
+
+
+def _numeric_property(column, cast, optional=False):
+    def getter(view):
+        value = view.table._columns[column][view.index]
+        if optional and value != value:
+            return None
+        return cast(value)
+
+    def setter(view, value):
+        view.table._columns[column][view.index] = np.nan if _is_missing(value) else value
+
+    return property(getter, setter)
+
+
+def _categorical_property(column):
+    def getter(view):
+        code = view.table._codes[column][view.index]
+        return None if code < 0 else view.table.categories[column][code]
+
+    def setter(view, value):
+        view.table._codes[column][view.index] = view.table.code_for(column, value)
+
+    return property(getter, setter)
+
+
+ProcedureView.procedure_id = _numeric_property('procedure_id', int)
+ProcedureView.arrival_time = _numeric_property('arrival_time', float)
+ProcedureView.duration = _numeric_property('duration', float)
+ProcedureView.start_time = _numeric_property('start_time', float, optional=True)
+ProcedureView.end_time = _numeric_property('end_time', float, optional=True)
+for _column in CATEGORICAL_COLUMNS:
+    setattr(ProcedureView, _column, _categorical_property(_column))
+
+
+class ProcedureTable:
+    def __init__(self, capacity=0):
+        capacity = max(capacity, 16)
+        self.size = 0
+        self._columns = {name: np.full(capacity, np.nan if dtype is np.float64 else 0, dtype=dtype)
+                         for name, dtype in NUMERIC_COLUMNS.items()}
+        self._codes = {name: np.full(capacity, -1, dtype=np.int16) for name in CATEGORICAL_COLUMNS}
+        self.categories = {name: [] for name in CATEGORICAL_COLUMNS}
+        self._lookup = {name: {} for name in CATEGORICAL_COLUMNS}
+
+    @classmethod
+    def from_columns(cls, procedure_id, urgency_level, procedure_name, equipment, surgeon,
+                     arrival_time, duration, start_time=None, end_time=None):
+        size = len(procedure_id)
+        table = cls(size)
+        table.size = size
+        table._columns['procedure_id'][:size] = procedure_id
+        table._columns['arrival_time'][:size] = arrival_time
+        table._columns['duration'][:size] = duration
+        if start_time is not None:
+            table._columns['start_time'][:size] = start_time
+        if end_time is not None:
+            table._columns['end_time'][:size] = end_time
+        for name, values in zip(CATEGORICAL_COLUMNS, (urgency_level, procedure_name, equipment, surgeon)):
+            codes, uniques = _factorize(values)
+            table.categories[name] = uniques
+            table._lookup[name] = {value: code for code, value in enumerate(uniques)}
+            table._codes[name][:size] = codes
+        return table
+
+    @classmethod
+    def from_arrays(cls, columns, codes, categories):
+        table = cls(0)
+        table.size = len(columns['procedure_id'])
+        table._columns = dict(columns)
+        table._codes = dict(codes)
+        table.categories = {name: list(values) for name, values in categories.items()}
+        table._lookup = {name: {value: code for code, value in enumerate(values)}
+                         for name, values in table.categories.items()}
+        return table
+
+    @classmethod
+    def from_dataframe(cls, df):
+        id_column = 'procedure_id' if 'procedure_id' in df.columns else 'id'
+        optional = {name: df[name].to_numpy(dtype=np.float64, na_value=np.nan)
+                    for name in ('start_time', 'end_time') if name in df.columns}
+        return cls.from_columns(df[id_column].to_numpy(dtype=np.int64),
+                                *(df[name] for name in CATEGORICAL_COLUMNS),
+                                df['arrival_time'].to_numpy(dtype=np.float64),
+                                df['duration'].to_numpy(dtype=np.float64),
+                                **optional)
+
+    @classmethod
+    def from_procedures(cls, procedures):
+        if isinstance(procedures, cls):
+            return procedures
+        columns = {name: [getattr(p, name) for p in procedures] for name in COLUMNS}
+        for name in ('start_time', 'end_time'):
+            columns[name] = [np.nan if _is_missing(value) else value for value in columns[name]]
+        return cls.from_columns(**columns)
+
+    @classmethod
+    def read_csv(cls, filename):
+        df = pd.read_csv(filename, dtype={name: 'category' for name in CATEGORICAL_COLUMNS}, float_precision='round_trip')
+        return cls.from_dataframe(df)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [ProcedureView(self, i) for i in range(*index.indices(self.size))]
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("procedure index out of range")
+        return ProcedureView(self, index)
+
+    def __iter__(self):
+        for i in range(self.size):
+            yield ProcedureView(self, i)
+
+    def slice(self, start, stop):
+        # Shares columns and categories with this table, so writes through the slice are visible here
+        table = ProcedureTable(0)
+        table._columns = {name: column[start:min(stop, self.size)] for name, column in self._columns.items()}
+        table._codes = {name: codes[start:min(stop, self.size)] for name, codes in self._codes.items()}
+        table.size = len(table._columns['procedure_id'])
+        table.categories = self.categories
+        table._lookup = self._lookup
+        return table
+
+    def column(self, name):
+        return self._columns[name][:self.size]
+
+    @property
+    def codes(self):
+        return {name: codes[:self.size] for name, codes in self._codes.items()}
+
+    def code_for(self, column, value):
+        if _is_missing(value):
+            return -1
+        lookup = self._lookup[column]
+        if value not in lookup:
+            lookup[value] = len(self.categories[column])
+            self.categories[column].append(value)
+        return lookup[value]
+
+    def append(self, procedure_id, urgency_level, procedure_name, equipment, surgeon, arrival_time, duration):
+        if self.size == self._columns['procedure_id'].shape[0]:
+            self._grow()
+        index = self.size
+        self.size += 1
+        self._columns['procedure_id'][index] = procedure_id
+        self._columns['arrival_time'][index] = arrival_time
+        self._columns['duration'][index] = duration
+        self._columns['start_time'][index] = np.nan
+        self._columns['end_time'][index] = np.nan
+        for name, value in zip(CATEGORICAL_COLUMNS, (urgency_level, procedure_name, equipment, surgeon)):
+            self._codes[name][index] = self.code_for(name, value)
+        return ProcedureView(self, index)
+
+    def _grow(self):
+        capacity = max(self._columns['procedure_id'].shape[0] * 2, 16)
+        for name, old in self._columns.items():
+            new = np.full(capacity, np.nan if old.dtype == np.float64 else 0, dtype=old.dtype)
+            new[:old.shape[0]] = old
+            self._columns[name] = new
+        for name, old in self._codes.items():
+            new = np.full(capacity, -1, dtype=np.int16)
+            new[:old.shape[0]] = old
+            self._codes[name] = new
+
+    def categorical(self, column):
+        return pd.Categorical.from_codes(self._codes[column][:self.size], categories=self.categories[column])
+
+    def to_dataframe(self):
+        data = {}
+        for name in COLUMNS:
+            if name in NUMERIC_COLUMNS:
+                data[name] = self._columns[name][:self.size]
+            else:
+                data[name] = self.categorical(name)
+        return pd.DataFrame(data, columns=COLUMNS)
@@ -0,0 +1,180 @@
+import numpy as np
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter
+
+from procedure_table import ProcedureTable
+
+URGENCY_COLORS = {'Normal': 'tab:blue', 'Emergency': 'tab:red'}
+LABEL_LIMIT = 100
+ROW_LIMIT = 500
+MAX_FIGURE_HEIGHT = 30
+MAX_STEP_POINTS = 2000
+
+
+def _new_figure(figsize, output_path):
+    if output_path is not None:
+        # A bare Figure never touches pyplot or a display, so this also works on headless servers
+        return Figure(figsize=figsize)
+    import matplotlib.pyplot as plt
+    return plt.figure(figsize=figsize)
+
+
+def _finish(fig, output_path, dpi=100):
+    if output_path is not None:
+        fig.savefig(output_path, dpi=dpi, bbox_inches='tight')
+        return output_path
+    import matplotlib.pyplot as plt
+    plt.show()
+
+
+def _time_columns(procedures):
+    if isinstance(procedures, ProcedureTable):
+        start = procedures.column('start_time')
+        end = procedures.column('end_time')
+        urgency = np.asarray(procedures.categorical('urgency_level'), dtype=object)
+    else:
+        start = np.array([np.nan if p.start_time is None else p.start_time for p in procedures], dtype=np.float64)
+        end = np.array([np.nan if p.end_time is None else p.end_time for p in procedures], dtype=np.float64)
+        urgency = np.array([p.urgency_level for p in procedures], dtype=object)
+    return start, end, urgency
+
+
+def _bars(ax, rows, start, end, urgency, height):
+    # One collection per urgency class instead of one patch per procedure
+    for level, color in URGENCY_COLORS.items():
+        mask = urgency == level
+        if not mask.any():
+            continue
+        y, left, right = rows[mask], start[mask], end[mask]
+        verts = np.empty((y.shape[0], 4, 2))
+        verts[:, 0] = np.column_stack([left, y - height / 2])
+        verts[:, 1] = np.column_stack([left, y + height / 2])
+        verts[:, 2] = np.column_stack([right, y + height / 2])
+        verts[:, 3] = np.column_stack([right, y - height / 2])
+        ax.add_collection(PolyCollection(verts, facecolors=color, edgecolors='black', linewidths=0.3,
+                                         alpha=0.7, label=level))
+
+
+def render_gantt(procedures, output_path=None, rooms=None, label_limit=LABEL_LIMIT, row_limit=ROW_LIMIT, dpi=100):
+    start, end, urgency = _time_columns(procedures)
+    scheduled = ~(np.isnan(start) | np.isnan(end))
+    if len(procedures) > row_limit:
+        # Too many cases for one row each: stack them on one row per room (or per urgency class)
+        if rooms is not None:
+            keys = np.asarray(rooms)
+            names = [f"Room {room+1}" for room in np.unique(keys[scheduled])]
+            rows = np.searchsorted(np.unique(keys[scheduled]), keys).astype(np.float64)
+        else:
+            names = list(URGENCY_COLORS)
+            rows = np.array([names.index(level) if level in names else 0 for level in urgency], dtype=np.float64)
+    else:
+        names = None
+        rows = np.arange(len(procedures), dtype=np.float64)
+
+    num_rows = len(names) if names is not None else len(procedures)
+    fig = _new_figure((12, min(max(num_rows * 0.5, 4), MAX_FIGURE_HEIGHT)), output_path)
+    ax = fig.add_subplot()
+    _bars(ax, rows[scheduled], start[scheduled], end[scheduled], urgency[scheduled], 0.8)
+
+    if names is None and num_rows <= label_limit:
+        procedure_list = list(procedures)
+        for i in np.flatnonzero(scheduled):
+            procedure = procedure_list[i]
+            ax.text(procedure.start_time + 5, i, f"{procedure.procedure_name} (ID: {procedure.procedure_id})",
+                    verticalalignment='center', fontsize=8)
+            ax.text(procedure.start_time + 5, i + 0.2, f"Surgeon: {procedure.surgeon}",
+                    verticalalignment='center', fontsize=6)
+            ax.text(procedure.start_time + 5, i - 0.2, f"Urgency: {procedure.urgency_level}",
+                    verticalalignment='center', fontsize=6)
+        ax.set_yticks(range(num_rows))
+        ax.set_yticklabels([f"{procedure.procedure_name} (ID: {procedure.procedure_id})" for procedure in procedure_list])
+    elif names is not None:
+        ax.set_yticks(range(len(names)))
+        ax.set_yticklabels(names)
+    else:
+        ax.set_yticks([])
+
+    if scheduled.any():
+        ax.set_xlim(start[scheduled].min(), end[scheduled].max())
+        ax.legend(loc='upper right')
+    ax.set_ylim(-1, max(num_rows, 1))
+    ax.set_xlabel('Time (minutes)')
+    ax.set_ylabel('Procedures')
+    ax.set_title('Surgical Procedures Gantt Chart')
+    ax.grid(True)
+    return _finish(fig, output_path, dpi)
+
+
+def downsample_steps(times, values, max_points=MAX_STEP_POINTS):
+    # Keeps the first point and the minimum and maximum of every time bucket, so short
+    # dips and peaks survive while the point count stays bounded.
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values)
+    if times.shape[0] <= max_points:
+        return times, values
+    buckets = max(max_points // 3, 1)
+    edges = np.linspace(times[0], times[-1], buckets + 1)
+    bucket = np.clip(np.searchsorted(edges, times, side='right') - 1, 0, buckets - 1)
+    first = np.flatnonzero(np.r_[True, np.diff(bucket) != 0])
+    order = np.lexsort((values, bucket))
+    sorted_bucket = bucket[order]
+    lowest = order[np.flatnonzero(np.r_[True, np.diff(sorted_bucket) != 0])]
+    highest = order[np.flatnonzero(np.r_[np.diff(sorted_bucket) != 0, True])]
+    keep = np.unique(np.concatenate([first, lowest, highest, [times.shape[0] - 1]]))
+    return times[keep], values[keep]
+
+
+def _series_points(series):
+    if hasattr(series, 'points'):
+        return series.points()
+    if not series:
+        return np.zeros(0), np.zeros(0)
+    times, values = zip(*series)
+    return np.asarray(times), np.asarray(values)
+
+
+def _merged_points(group):
+    unique = list({id(series): series for series in group.values()}.values())
+    points = [_series_points(series) for series in unique]
+    points = [(times, values) for times, values in points if len(times)]
+    if not points:
+        return np.zeros(0), np.zeros(0)
+    times = np.concatenate([times for times, _ in points])
+    values = np.concatenate([values for _, values in points])
+    order = np.argsort(times, kind='stable')
+    return times[order], values[order]
+
+
+def render_charts(resource_allocation, num_rooms, num_equipment, num_surgeons, output_path=None,
+                  max_points=MAX_STEP_POINTS, dpi=100):
+    fig = _new_figure((12, 18), output_path)
+    axs = fig.subplots(nrows=3, ncols=1, sharex=True)
+
+    times, availability = downsample_steps(*_merged_points(resource_allocation['rooms']), max_points)
+    if len(times):
+        axs[0].step(times, availability, where='post', label='Room Availability')
+    axs[0].set_title('Room Allocation Over Time', fontsize=14)
+    axs[0].set_ylabel('Number of Available Rooms', fontsize=12)
+    axs[0].set_ylim(0, num_rooms)
+
+    panels = [(axs[1], 'equipment', 'Equipment Allocation Over Time', 'Number of Available Equipment', num_equipment),
+              (axs[2], 'doctors', 'Doctor Allocation Over Time', 'Number of Available Doctors', num_surgeons)]
+    for ax, group, title, ylabel, limit in panels:
+        for name, series in resource_allocation[group].items():
+            times, availability = _series_points(series)
+            if len(times):
+                times, availability = downsample_steps(times, availability, max_points)
+                ax.step(times, availability, where='post', label=name)
+        ax.set_title(title, fontsize=14)
+        ax.set_ylabel(ylabel, fontsize=12)
+        ax.set_ylim(0, limit)
+
+    fig.supxlabel('Time (minutes)', fontsize=14)
+    for ax in axs:
+        if ax.get_legend_handles_labels()[0]:
+            ax.legend(fontsize=12, loc='upper right')
+        ax.grid(True)
+        ax.xaxis.set_major_formatter(FuncFormatter(lambda x, _: f"{int(x):03d}"))
+    fig.tight_layout()
+    return _finish(fig, output_path, dpi)
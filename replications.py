@@ -0,0 +1,90 @@
+import argparse
+import functools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+import simpy
+
+import phase1
+
+SUMMARY_METRICS = ['utilization', 'wait_p50', 'wait_p90', 'wait_p99', 'overtime', 'emergency_delay', 'makespan']
+
+
+def replication_seeds(num_replications, base_seed=0):
+    return [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(base_seed).spawn(num_replications)]
+
+
+def run_replication(seed, num_procedures, num_rooms=phase1.NUM_OPERATING_ROOMS, day_length=phase1.SIMULATION_TIME):
+    rng = random.Random(seed)
+    procedures = phase1.create_procedures(num_procedures, output_path=None, rng=rng)
+    env = simpy.Environment()
+    room_resources = simpy.PriorityResource(env, capacity=num_rooms)
+    phase1.schedule_surgeries(env, procedures, room_resources, {}, rng=rng)
+    env.run()  # run past the end of the day so overtime is observable
+    return summarize_day(procedures, num_rooms, day_length)
+
+
+def summarize_day(procedures, num_rooms, day_length):
+    start = procedures.column('start_time')
+    end = procedures.column('end_time')
+    arrival = procedures.column('arrival_time')
+    done = ~np.isnan(end)
+    if not done.any():
+        return dict.fromkeys(SUMMARY_METRICS, 0.0)
+    waits = start[done] - arrival[done]
+    emergency = np.asarray(procedures.categorical('urgency_level') == 'Emergency')[done]
+    busy_in_day = np.clip(np.minimum(end[done], day_length) - start[done], 0, None).sum()
+    makespan = float(end[done].max())
+    p50, p90, p99 = np.percentile(waits, [50, 90, 99])
+    return {'utilization': float(busy_in_day / (num_rooms * day_length)),
+            'wait_p50': float(p50), 'wait_p90': float(p90), 'wait_p99': float(p99),
+            'overtime': max(0.0, makespan - day_length),
+            'emergency_delay': float(waits[emergency].mean()) if emergency.any() else 0.0,
+            'makespan': makespan}
+
+
+def run_replications(num_replications, num_procedures, base_seed=0, workers=None,
+                     num_rooms=phase1.NUM_OPERATING_ROOMS, day_length=phase1.SIMULATION_TIME):
+    seeds = replication_seeds(num_replications, base_seed)
+    replicate = functools.partial(run_replication, num_procedures=num_procedures, num_rooms=num_rooms,
+                                  day_length=day_length)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return [replicate(seed) for seed in seeds]
+    # Big chunks keep the per-task pickling overhead small next to each simulation
+    chunksize = max(1, num_replications // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(replicate, seeds, chunksize=chunksize))
+
+
+def confidence_intervals(results, confidence=0.95):
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    intervals = {}
+    for metric in SUMMARY_METRICS:
+        values = np.array([result[metric] for result in results], dtype=np.float64)
+        mean = values.mean()
+        half_width = z * values.std(ddof=1) / np.sqrt(len(values)) if len(values) > 1 else 0.0
+        intervals[metric] = (float(mean), float(mean - half_width), float(mean + half_width))
+    return intervals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run independent seeded replications of the OR simulation.")
+    parser.add_argument('replications', type=int)
+    parser.add_argument('procedures', type=int)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--rooms', type=int, default=phase1.NUM_OPERATING_ROOMS)
+    parser.add_argument('--confidence', type=float, default=0.95)
+    args = parser.parse_args()
+
+    results = run_replications(args.replications, args.procedures, args.seed, args.workers, args.rooms)
+    for metric, (mean, low, high) in confidence_intervals(results, args.confidence).items():
+        print(f"{metric:>16}: {mean:10.3f}  [{low:10.3f}, {high:10.3f}]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import glob
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from list_scheduler import list_schedule, replan_from
+from procedure_table import ProcedureTable
+
+POLICIES = ['priority']
+DEFAULT_CAPACITY = 32
+
+
+def _category_hashes(values):
+    return np.array([int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'little')
+                     for value in values] + [0], dtype=np.uint64)
+
+
+def _mix(hashes, values):
+    # splitmix64-style finaliser, applied column by column to every row at once
+    with np.errstate(over='ignore'):
+        hashes = (hashes ^ values) * np.uint64(0x9E3779B97F4A7C15)
+        hashes ^= hashes >> np.uint64(31)
+        hashes *= np.uint64(0xBF58476D1CE4E5B9)
+        return hashes ^ (hashes >> np.uint64(29))
+
+
+def procedure_fingerprints(procedures):
+    # One 64-bit hash per procedure over everything the scheduler reads from it. Category
+    # values are hashed by content, so the same case hashes alike in any table.
+    table = ProcedureTable.from_procedures(procedures)
+    hashes = np.zeros(len(table), dtype=np.uint64)
+    hashes = _mix(hashes, table.column('procedure_id').astype(np.uint64))
+    for name in ('arrival_time', 'duration'):
+        hashes = _mix(hashes, np.ascontiguousarray(table.column(name), dtype=np.float64).view(np.uint64))
+    for name, codes in table.codes.items():
+        hashes = _mix(hashes, _category_hashes(table.categories[name])[codes])
+    return table, hashes
+
+
+def config_key(num_rooms, equipment_units, surgeon_units, policy):
+    config = {'rooms': num_rooms, 'equipment': sorted((equipment_units or {}).items()),
+              'surgeons': sorted((surgeon_units or {}).items()), 'policy': policy}
+    return hashlib.blake2b(json.dumps(config).encode(), digest_size=8).hexdigest()
+
+
+class ScheduleCache:
+    # Schedules keyed by the configuration and the fingerprints of every procedure. An exact
+    # hit copies the cached times back; otherwise the newest schedule of the same
+    # configuration is reused up to the first moment one of the changed cases matters,
+    # and only the rest of the day is re-planned.
+    def __init__(self, capacity=DEFAULT_CAPACITY, directory=None):
+        self.capacity = capacity
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def _remember(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def _store(self, key, entry):
+        self._remember(key, entry)
+        if self.directory is not None:
+            np.savez(os.path.join(self.directory, f'{key}.npz'), **entry)
+
+    def _load(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        if self.directory is not None:
+            path = os.path.join(self.directory, f'{key}.npz')
+            if os.path.exists(path):
+                with np.load(path) as data:
+                    entry = {name: data[name] for name in data.files}
+                # Already on disk; rewriting it would only bump its mtime
+                self._remember(key, entry)
+                return entry
+        return None
+
+    def _base(self, prefix):
+        # Newest schedule with the same configuration, in memory first, then on disk
+        for key in reversed(self.entries):
+            if key.startswith(prefix):
+                return self.entries[key]
+        if self.directory is not None:
+            paths = glob.glob(os.path.join(self.directory, f'{prefix}*.npz'))
+            if paths:
+                return self._load(os.path.basename(max(paths, key=os.path.getmtime))[:-4])
+        return None
+
+    def schedule(self, procedures, num_rooms, equipment_units=None, surgeon_units=None, policy='priority'):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown scheduling policy: {policy}")
+        table, fingerprints = procedure_fingerprints(procedures)
+        prefix = config_key(num_rooms, equipment_units, surgeon_units, policy)
+        key = f"{prefix}-{hashlib.blake2b(fingerprints.tobytes(), digest_size=16).hexdigest()}"
+
+        entry = self._load(key)
+        if entry is not None:
+            self.hits += 1
+            table.column('start_time')[:] = entry['start']
+            table.column('end_time')[:] = entry['end']
+            return table, entry['room']
+
+        base = self._base(prefix)
+        # An empty base has nothing to reuse
+        if base is None or len(base['procedure_id']) == 0:
+            self.misses += 1
+            rooms = np.full(len(table), -1, dtype=np.int64)
+            for procedure, room in list_schedule(table, num_rooms, equipment_units, surgeon_units):
+                rooms[procedure.index] = room
+        else:
+            self.partial_hits += 1
+            rooms = self._reuse(table, fingerprints, base, num_rooms, equipment_units, surgeon_units)
+
+        self._store(key, {'fingerprints': fingerprints, 'procedure_id': table.column('procedure_id').copy(),
+                          'start': table.column('start_time').copy(), 'end': table.column('end_time').copy(),
+                          'room': rooms})
+        return table, rooms
+
+    def _reuse(self, table, fingerprints, base, num_rooms, equipment_units, surgeon_units):
+        ids = table.column('procedure_id')
+        order = np.argsort(base['procedure_id'], kind='stable')
+        base_ids = base['procedure_id'][order]
+        position = np.clip(np.searchsorted(base_ids, ids), 0, max(len(base_ids) - 1, 0))
+        found = np.zeros(len(ids), dtype=bool)
+        if len(base_ids):
+            found = base_ids[position] == ids
+        matched = order[position]
+        unchanged = found & (base['fingerprints'][matched] == fingerprints)
+
+        # A change first matters at the earlier of the case's old start and its new arrival;
+        # a case that disappeared matters from its old start
+        arrivals = table.column('arrival_time')
+        since = np.inf
+        if (~unchanged).any():
+            old_starts = np.where(found, base['start'][matched], np.inf)
+            since = min(since, float(np.nanmin(np.minimum(old_starts, arrivals)[~unchanged])))
+        kept = np.zeros(len(base_ids), dtype=bool)
+        kept[matched[unchanged]] = True
+        if (~kept).any():
+            since = min(since, float(np.nanmin(np.where(kept, np.inf, base['start']))))
+
+        start = np.where(unchanged, base['start'][matched], np.nan)
+        end = np.where(unchanged, base['end'][matched], np.nan)
+        rooms = np.where(unchanged, base['room'][matched], -1).astype(np.int64)
+        table.column('start_time')[:] = start
+        table.column('end_time')[:] = end
+        if np.isinf(since):
+            return rooms
+        room_of = {int(procedure_id): int(room) for procedure_id, room in zip(ids[unchanged], rooms[unchanged])}
+        for procedure, room in replan_from(table, room_of, since, num_rooms, equipment_units, surgeon_units):
+            rooms[procedure.index] = room
+        return rooms
+
+    def clear(self):
+        self.entries.clear()
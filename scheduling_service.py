@@ -0,0 +1,232 @@
+import argparse
+import asyncio
+import json
+import math
+import time
+
+import Code
+from list_scheduler import replan_from
+
+ARRIVE = 'arrive'
+CANCEL = 'cancel'
+UPDATE_DURATION = 'update_duration'
+ADVANCE = 'advance'
+
+
+class OnlinePlanner:
+    # Keeps a list-schedule plan for the day and repairs it as events come in. List
+    # scheduling only looks at what has happened up to each decision point, so a change
+    # that first matters at time t leaves every decision before t untouched: those
+    # procedures keep their rooms and times, and only the tail from t on is re-planned,
+    # starting from the rooms and resources still held at t.
+    def __init__(self, num_rooms=Code.NUM_OPERATING_ROOMS, equipment_units=None, surgeon_units=None, now=0):
+        self.num_rooms = num_rooms
+        self.equipment_units = dict(Code.equipment_units() if equipment_units is None else equipment_units)
+        self.surgeon_units = dict(Code.surgeon_units() if surgeon_units is None else surgeon_units)
+        self.now = now
+        self.active = {}
+        self.completed = {}
+        self.rooms = {}
+
+    def plan(self):
+        return {procedure_id: (self.rooms[procedure_id], procedure.start_time, procedure.end_time)
+                for procedure_id, procedure in self.active.items()}
+
+    def advance(self, time):
+        # Moving the clock never changes the plan; it only freezes what has finished
+        self.now = max(self.now, time)
+        for procedure_id, procedure in list(self.active.items()):
+            if procedure.end_time is not None and procedure.end_time <= self.now:
+                self.completed[procedure_id] = self.active.pop(procedure_id)
+        return []
+
+    def _check_new(self, procedure_id):
+        if procedure_id in self.active or procedure_id in self.completed:
+            raise ValueError(f"Procedure {procedure_id} is already known")
+
+    def arrive(self, procedure):
+        self._check_new(procedure.procedure_id)
+        procedure.arrival_time = max(procedure.arrival_time, self.now)
+        self.active[procedure.procedure_id] = procedure
+        return self._repair(procedure.arrival_time)
+
+    def cancel(self, procedure_id):
+        procedure = self.active.get(procedure_id)
+        if procedure is None:
+            return []
+        if procedure.start_time is not None and procedure.start_time < self.now:
+            # A case already under way is cut short: its room and team are free from now on
+            return self.update_duration(procedure_id, self.now - procedure.start_time)
+        del self.active[procedure_id]
+        self.rooms.pop(procedure_id, None)
+        since = procedure.start_time if procedure.start_time is not None else self.now
+        return self._repair(since, exclude=procedure_id)
+
+    def update_duration(self, procedure_id, duration):
+        procedure = self.active.get(procedure_id)
+        if procedure is None:
+            return []
+        duration = _time_value(duration, 'duration')
+        old_end = procedure.end_time
+        procedure.duration = duration
+        if procedure.start_time is None:
+            return self._repair(self.now)
+        procedure.end_time = max(procedure.start_time + duration, self.now)
+        if procedure.start_time >= self.now:
+            return self._repair(procedure.start_time)
+        return self._repair(min(old_end, procedure.end_time))
+
+    def _repair(self, since, exclude=None):
+        since = max(since, self.now)
+        before = {procedure_id: (self.rooms.get(procedure_id), procedure.start_time)
+                  for procedure_id, procedure in self.active.items()}
+        schedule = replan_from(self.active.values(), self.rooms, since, self.num_rooms,
+                               self.equipment_units, self.surgeon_units)
+        changes = []
+        for procedure, room in schedule:
+            self.rooms[procedure.procedure_id] = room
+            if before.get(procedure.procedure_id) != (room, procedure.start_time):
+                changes.append((procedure.procedure_id, room, procedure.start_time, procedure.end_time))
+        if exclude is not None:
+            changes.append((exclude, None, None, None))
+        return changes
+
+    def handle(self, event):
+        # event is a dict with a 'type' and an optional 'time'; returns the changed plan entries
+        # Every field is checked before any state changes, so a bad event leaves the plan as it was
+        if not isinstance(event, dict):
+            raise ValueError("event must be a JSON object")
+        kind = event['type']
+        if kind == ARRIVE:
+            procedure = procedure_from_dict(event['procedure'], self.now)
+            self._check_new(procedure.procedure_id)
+        elif kind in (CANCEL, UPDATE_DURATION):
+            procedure_id = _procedure_id(event['procedure_id'])
+            if kind == UPDATE_DURATION:
+                duration = _time_value(event['duration'], 'duration')
+        elif kind != ADVANCE:
+            raise ValueError(f"Unknown event type: {kind}")
+        if 'time' in event:
+            self.advance(_time_value(event['time'], 'time'))
+
+        if kind == ARRIVE:
+            return self.arrive(procedure)
+        if kind == CANCEL:
+            return self.cancel(procedure_id)
+        if kind == UPDATE_DURATION:
+            return self.update_duration(procedure_id, duration)
+        return []
+
+
+def _time_value(value, name):
+    # Accepts numbers and numeric strings; times and durations must be finite and non-negative
+    if isinstance(value, bool):
+        raise ValueError(f"{name} must be a number, got {value!r}")
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number, got {value!r}") from None
+    if not math.isfinite(value) or value < 0:
+        raise ValueError(f"{name} must be a finite, non-negative number, got {value!r}")
+    return value
+
+
+def _procedure_id(value):
+    if isinstance(value, bool) or isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"procedure_id must be an integer, got {value!r}")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"procedure_id must be an integer, got {value!r}") from None
+
+
+def procedure_from_dict(data, now=0):
+    if not isinstance(data, dict):
+        raise ValueError("procedure must be a JSON object")
+    return Code.SurgicalProcedure(_procedure_id(data['procedure_id']), data.get('urgency_level', 'Normal'),
+                                  data.get('procedure_name'), data.get('equipment'), data.get('surgeon'),
+                                  _time_value(data.get('arrival_time', now), 'arrival_time'),
+                                  _time_value(data['duration'], 'duration'))
+
+
+class SchedulingService:
+    # Serialises events from any number of producers through one queue, so the planner
+    # itself never has to be re-entrant
+    def __init__(self, planner=None):
+        self.planner = planner or OnlinePlanner()
+        self.queue = asyncio.Queue()
+        self.latencies = []
+        self._worker = None
+
+    async def start(self):
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def submit(self, event):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((event, future))
+        return await future
+
+    async def _run(self):
+        while True:
+            event, future = await self.queue.get()
+            # The submitter gave up while the event was queued (e.g. its client went away):
+            # drop the event rather than apply it with nobody to tell
+            if future.done():
+                self.queue.task_done()
+                continue
+            start = time.perf_counter()
+            try:
+                changes = self.planner.handle(event)
+            except Exception as error:
+                future.set_exception(error)
+            else:
+                latency = time.perf_counter() - start
+                self.latencies.append(latency)
+                future.set_result({'changes': changes, 'latency': latency, 'now': self.planner.now})
+            self.queue.task_done()
+
+    async def handle_client(self, reader, writer):
+        # One JSON event per line in, one JSON reply per line out
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    reply = await self.submit(json.loads(line))
+                except (ValueError, KeyError, TypeError) as error:
+                    reply = {'error': str(error)}
+                writer.write(json.dumps(reply).encode() + b'\n')
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+async def serve(host='127.0.0.1', port=8765, planner=None):
+    service = SchedulingService(planner)
+    await service.start()
+    server = await asyncio.start_server(service.handle_client, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve online scheduling decisions over a JSON-lines socket.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--rooms', type=int, default=Code.NUM_OPERATING_ROOMS)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, OnlinePlanner(args.rooms)))
+
+
+if __name__ == "__main__":
+    main()
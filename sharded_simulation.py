@@ -0,0 +1,275 @@
+import argparse
+import json
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import simpy
+
+import phase1
+from workload import WorkloadSpec, generate_batch
+
+REPORT_METRICS = ['procedures', 'completed', 'deferrals', 'utilization', 'wait_p50', 'wait_p90', 'wait_p99',
+                  'emergency_delay', 'overtime', 'max_overtime', 'conflicts']
+
+
+class Site:
+    def __init__(self, name, rooms=phase1.NUM_OPERATING_ROOMS, equipment=None, surgeons=None,
+                 procedures_per_day=100, day_length=phase1.SIMULATION_TIME, workload=None):
+        # equipment and surgeons map each name in the site's pools to its number of units;
+        # workload holds WorkloadSpec arguments, and its mixes default to the site's own pools
+        self.name = name
+        self.rooms = rooms
+        # An empty pool is kept as given: that site has no such resources
+        self.equipment = dict({equip: 1 for equip in phase1.available_equipment} if equipment is None else equipment)
+        self.surgeons = dict({doctor: 1 for doctor in phase1.surgeon_names} if surgeons is None else surgeons)
+        self.procedures_per_day = procedures_per_day
+        self.day_length = day_length
+        workload = dict({} if workload is None else workload)
+        workload.setdefault('arrivals', 'uniform')
+        workload.setdefault('horizon', day_length)
+        workload.setdefault('equipment_mix', _pool_mix(self.equipment))
+        workload.setdefault('surgeon_mix', _pool_mix(self.surgeons))
+        self.spec = WorkloadSpec(**workload)
+
+
+def _pool_mix(pool, share=0.5):
+    # Half the cases need something from the pool, spread evenly over its names
+    mix = {name: share / len(pool) for name in pool}
+    mix[None] = 1.0 - share if pool else 1.0
+    return mix
+
+
+DEFAULT_SITES = [Site('North', rooms=4, procedures_per_day=560),
+                 Site('South', rooms=2, procedures_per_day=240)]
+
+
+def load_sites(path):
+    with open(path) as f:
+        config = json.load(f)
+    return [Site(**entry) for entry in config['sites']]
+
+
+def _shard_rngs(seed, site_index, day):
+    # Every (site, day) draws from its own stream, so a shard's workload and room choices
+    # are the same whichever worker runs it and whatever carried in
+    sequence = np.random.SeedSequence(seed, spawn_key=(site_index, day))
+    state = sequence.generate_state(2)
+    return np.random.default_rng(int(state[0])), random.Random(int(state[1]))
+
+
+def _case(procedure, duration):
+    return (int(procedure.procedure_id), procedure.urgency_level, procedure.procedure_name,
+            procedure.equipment, procedure.surgeon, float(duration))
+
+
+def run_day(site, site_index, day, seed=0, carry_in=((), ())):
+    # carry_in is (deferred, overruns) from the day before: deferred cases were still waiting
+    # at closing and join today's queue at the start of the day, with the time they had
+    # already waited; overruns are cases that ran past the end of yesterday and keep their
+    # room, surgeon and equipment until their remaining time is up.
+    deferred, overruns = carry_in
+    rng, room_rng = _shard_rngs(seed, site_index, day)
+    procedures, _ = generate_batch(rng, site.spec, site.procedures_per_day, day * site.procedures_per_day)
+    waited = {}
+    for procedure_id, urgency, name, equipment, surgeon, duration, already_waited in deferred:
+        procedures.append(procedure_id, urgency, name, equipment, surgeon, 0.0, duration)
+        waited[procedure_id] = already_waited
+
+    env = simpy.Environment()
+    room_resources = simpy.PriorityResource(env, capacity=site.rooms)
+    allocation = phase1.new_resource_allocation(site.rooms, site.equipment, site.surgeons)
+    tracker = phase1.ResourceTracker(allocation, site.rooms, site.equipment, site.surgeons)
+    tracker.record_initial(env.now)
+    # Overruns are started first, so they hold their rooms before any of today's cases ask
+    continued = [phase1.SurgicalProcedure(*case[:5], 0.0, case[5]) for case in overruns]
+    for room_id, overrun in enumerate(continued):
+        env.process(phase1.surgery_process(env, overrun, room_resources, allocation, room_id, tracker))
+    phase1.schedule_surgeries(env, procedures, room_resources, allocation, tracker, room_rng,
+                              num_rooms=site.rooms, closing_time=site.day_length)
+    env.run()
+
+    start = procedures.column('start_time')
+    end = procedures.column('end_time')
+    started = ~np.isnan(start)
+    prior = np.array([waited.get(int(procedure_id), 0.0) for procedure_id in procedures.column('procedure_id')])
+    waits = (start - procedures.column('arrival_time') + prior)[started]
+    emergency = np.asarray(procedures.categorical('urgency_level') == 'Emergency')[started]
+
+    # A case that arrived after closing has not waited yet when it carries over
+    carry_deferred = tuple(_case(procedure, procedure.duration)
+                           + (max(0.0, site.day_length - procedure.arrival_time) + waited.get(procedure.procedure_id, 0.0),)
+                           for procedure in procedures if procedure.start_time is None)
+    carry_overruns = tuple(_case(procedure, procedure.end_time - site.day_length)
+                           for procedure in list(procedures) + continued
+                           if procedure.end_time is not None and procedure.end_time > site.day_length)
+    rooms_free = next(iter(allocation['rooms'].values()))
+    return {'day': day, 'carry_in': (tuple(deferred), tuple(overruns)), 'carry': (carry_deferred, carry_overruns),
+            'procedures': len(procedures) - len(deferred), 'completed': int(started.sum()),
+            'deferrals': len(carry_deferred), 'waits': waits, 'emergency': emergency,
+            'busy': site.rooms * site.day_length - rooms_free.integral(0, site.day_length),
+            'overtime': max(0.0, float(np.nanmax(end, initial=0.0)) - site.day_length),
+            'conflicts': len(tracker.bookings.conflicts),
+            'timelines': {'rooms': rooms_free.points(),
+                          'equipment': {name: timeline.points() for name, timeline in allocation['equipment'].items()},
+                          'doctors': {name: timeline.points() for name, timeline in allocation['doctors'].items()}}}
+
+
+def estimate_carry(site, site_index, day, seed=0, warmup_days=1):
+    # A cheap guess at what carries into `day`: the days just before it, run from an empty
+    # start. It is exact whenever those days hand on the same carry whatever came in.
+    carry = ((), ())
+    for previous in range(max(0, day - warmup_days), day):
+        carry = run_day(site, site_index, previous, seed, carry)['carry']
+    return carry
+
+
+def run_days(site, site_index, first_day, num_days, seed=0, carry_in=None, previous=None):
+    # A shard of consecutive days at one site; overruns carry from each day to the next.
+    # Without a carry_in the shard starts from an estimate. previous holds the carry each of
+    # these days handed on in an earlier run; the shard stops at the first day that hands on
+    # the same again, since the days after it would not change.
+    if carry_in is None:
+        carry_in = estimate_carry(site, site_index, first_day, seed)
+    results = []
+    for offset, day in enumerate(range(first_day, first_day + num_days)):
+        results.append(run_day(site, site_index, day, seed, carry_in))
+        carry_in = results[-1]['carry']
+        if previous is not None and previous[offset] == carry_in:
+            break
+    return results
+
+
+def run_sharded(sites, num_days, seed=0, workers=None, block_days=None):
+    # Every shard is started in parallel from an estimate of what carries into its first day.
+    # Each round then re-runs from every day whose carry-in differs from what the day before
+    # handed on, until none do. A re-run goes on until a day hands on the same carry as
+    # before, up to the next mismatch; the re-run from a site's first mismatch, whose
+    # carry-in is final, may go on to the last day.
+    #
+    # This pays off when carry is short-lived, as when a day's overruns and deferrals clear
+    # the next morning. Under sustained overload the backlog carries on from day to day, no
+    # estimate holds, and each site ends up re-run in sequence from its first mismatch:
+    # then only the sites run in parallel, and each costs its first pass on top of a
+    # sequential run.
+    workers = workers or os.cpu_count() or 1
+    if block_days is None:
+        block_days = math.ceil(num_days * len(sites) / (workers * 4))
+    block_days = max(1, min(block_days, num_days))
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    def run_all(tasks):
+        if executor is None:
+            return [run_days(*task) for task in tasks]
+        return [future.result() for future in [executor.submit(run_days, *task) for task in tasks]]
+
+    try:
+        tasks = [(site, index, first_day, min(block_days, num_days - first_day), seed)
+                 for index, site in enumerate(sites) for first_day in range(0, num_days, block_days)]
+        days = [[None] * num_days for _ in sites]
+        for (_, index, _, _, _), results in zip(tasks, run_all(tasks)):
+            for result in results:
+                days[index][result['day']] = result
+        shards = len(tasks)
+
+        reruns = 0
+        rounds = 0
+        while True:
+            repairs = []
+            for index, site_days in enumerate(days):
+                mismatches = [day for day in range(1, num_days)
+                              if site_days[day]['carry_in'] != site_days[day - 1]['carry']]
+                for position, day in enumerate(mismatches):
+                    stop = mismatches[position + 1] if position and position + 1 < len(mismatches) else num_days
+                    repairs.append((sites[index], index, day, stop - day, seed, site_days[day - 1]['carry'],
+                                    [result['carry'] for result in site_days[day:stop]]))
+            if not repairs:
+                break
+            rounds += 1
+            # Applied last, the re-run from each site's first mismatch wins wherever it overlaps
+            for (_, index, _, _, _, _, _), results in reversed(list(zip(repairs, run_all(repairs)))):
+                reruns += len(results)
+                for result in results:
+                    days[index][result['day']] = result
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return merge_results(sites, days), {'shards': shards, 'block_days': block_days,
+                                        'repair_rounds': rounds, 'reruns': reruns}
+
+
+def merge_timelines(site, site_days):
+    # Each day's points are shifted onto one clock. A day only contributes up to the start of
+    # the next, which opens with yesterday's overruns already holding their resources.
+    allocation = phase1.new_resource_allocation(site.rooms, site.equipment, site.surgeons)
+    for position, result in enumerate(site_days):
+        offset = result['day'] * site.day_length
+        last = position == len(site_days) - 1
+        # Rooms share one timeline, so it is extended once rather than once per room
+        pairs = [(next(iter(allocation['rooms'].values())), result['timelines']['rooms'])]
+        for kind in ('equipment', 'doctors'):
+            pairs += [(allocation[kind][name], points) for name, points in result['timelines'][kind].items()]
+        for timeline, (times, values) in pairs:
+            keep = slice(None) if last else times < site.day_length
+            for time, value in zip(times[keep], values[keep]):
+                timeline.record(offset + time, value)
+    return allocation
+
+
+def summarize(site_days, capacity):
+    # capacity is the room time on offer over the same days, in room-time units
+    waits = np.concatenate([result['waits'] for result in site_days])
+    emergency = np.concatenate([result['emergency'] for result in site_days])
+    summary = {name: sum(result[name] for result in site_days)
+               for name in ('procedures', 'completed', 'deferrals', 'overtime', 'conflicts')}
+    summary['utilization'] = sum(result['busy'] for result in site_days) / capacity if capacity else 0.0
+    p50, p90, p99 = np.percentile(waits, [50, 90, 99]) if waits.size else (0.0, 0.0, 0.0)
+    summary.update({'wait_p50': float(p50), 'wait_p90': float(p90), 'wait_p99': float(p99),
+                    'emergency_delay': float(waits[emergency].mean()) if emergency.any() else 0.0,
+                    'max_overtime': max((result['overtime'] for result in site_days), default=0.0)})
+    return {name: summary[name] for name in REPORT_METRICS}
+
+
+def merge_results(sites, days):
+    report = {'sites': {}, 'timelines': {}}
+    for site, site_days in zip(sites, days):
+        report['sites'][site.name] = summarize(site_days, site.rooms * site.day_length * len(site_days))
+        report['timelines'][site.name] = merge_timelines(site, site_days)
+    all_days = [result for site_days in days for result in site_days]
+    capacity = sum(site.rooms * site.day_length * len(site_days) for site, site_days in zip(sites, days))
+    report['total'] = summarize(all_days, capacity)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate several sites over several days, sharded across processes.")
+    parser.add_argument('days', type=int)
+    parser.add_argument('--sites', help="JSON file with a 'sites' list of Site settings")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--block-days', type=int, default=None, help="consecutive days per shard")
+    parser.add_argument('--output', help="write the merged report as JSON")
+    parser.add_argument('--charts', help="directory for each site's merged resource charts")
+    args = parser.parse_args()
+
+    sites = load_sites(args.sites) if args.sites else DEFAULT_SITES
+    report, stats = run_sharded(sites, args.days, args.seed, args.workers, args.block_days)
+    print(f"{stats['shards']} shards of up to {stats['block_days']} days, "
+          f"{stats['reruns']} days re-run in {stats['repair_rounds']} repair rounds")
+    for name, summary in list(report['sites'].items()) + [('total', report['total'])]:
+        print(f"{name:>10}: " + " ".join(f"{metric}={summary[metric]:.3f}" if isinstance(summary[metric], float)
+                                         else f"{metric}={summary[metric]}" for metric in REPORT_METRICS))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'sites': report['sites'], 'total': report['total'], 'sharding': stats}, f, indent=2)
+    if args.charts:
+        os.makedirs(args.charts, exist_ok=True)
+        for site in sites:
+            phase1.render_charts(report['timelines'][site.name], site.rooms, len(site.equipment), len(site.surgeons),
+                                 os.path.join(args.charts, f'{site.name}_resources.png'))
+
+
+if __name__ == "__main__":
+    main()
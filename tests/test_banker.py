@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from banker import BankerState
+
+
+def fresh_check(banker):
+    # From-scratch Banker's safety check on a copy of the current matrices
+    work = banker.available.copy()
+    need = banker.need.copy()
+    allocation = banker.allocation.copy()
+    done = np.zeros(banker.size, dtype=bool)
+    progress = True
+    while progress:
+        progress = False
+        for i in range(banker.size):
+            if not done[i] and np.all(need[i] <= work):
+                work += allocation[i]
+                done[i] = True
+                progress = True
+    return bool(done.all())
+
+
+def assert_valid_sequence(banker, sequence):
+    assert sorted(sequence) == list(range(banker.size))
+    work = banker.available.copy()
+    for i in sequence:
+        assert np.all(banker.need[i] <= work)
+        work += banker.allocation[i]
+
+
+def random_state(rng, processes, resources):
+    total = rng.integers(1, 5, resources)
+    max_claim = np.minimum(rng.integers(0, 4, (processes, resources)), total)
+    return BankerState(total, max_claim), max_claim
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_incremental_request_and_release_match_full_check(seed):
+    rng = np.random.default_rng(seed)
+    banker, _ = random_state(rng, int(rng.integers(2, 12)), int(rng.integers(1, 5)))
+    for _ in range(200):
+        process = int(rng.integers(banker.size))
+        if rng.random() < 0.6 and banker.need[process].any():
+            amounts = rng.integers(0, banker.need[process] + 1)
+            if rng.random() < 0.3:
+                amounts = banker.need[process].copy()
+            fits = bool(np.all(amounts <= banker.available))
+            before = banker.allocation.copy()
+            granted = banker.request(process, amounts)
+            if granted:
+                assert fits
+            else:
+                # A refusal leaves the state untouched, and granting would have been unsafe
+                assert np.array_equal(banker.allocation, before)
+                if fits:
+                    allocation = banker.allocation.copy()
+                    allocation[process] += amounts
+                    assert BankerState(banker.available - amounts, banker.max, allocation).safe_sequence() is None
+        elif banker.allocation[process].any():
+            banker.release(process, rng.integers(0, banker.allocation[process] + 1))
+
+        assert banker.is_safe() == fresh_check(banker)
+        sequence = banker.safe_sequence()
+        assert (sequence is not None) == fresh_check(banker)
+        if sequence is not None:
+            assert_valid_sequence(banker, sequence)
+
+
+def test_full_claim_request_from_an_unsafe_state_is_checked():
+    banker = BankerState([1], [[3], [3], [1]], [[1], [1], [0]])
+    assert not banker.is_safe()
+    assert banker.request(2, [1]) is False
+    assert not banker.is_safe()
+    assert banker.safe_sequence() is None
+
+
+def test_add_process_keeps_state_safe():
+    banker = BankerState([2, 1], [[1, 1], [2, 0]])
+    assert banker.request(0, [1, 1])
+    index = banker.add_process([2, 1])
+    assert banker.is_safe() == fresh_check(banker)
+    assert_valid_sequence(banker, banker.safe_sequence())
+    assert index == 2
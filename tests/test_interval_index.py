@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from interval_index import ResourceIntervals
+
+
+def running(bookings, time):
+    return [owner for start, end, owner in bookings if start <= time < end]
+
+
+def full(bookings, start, end, units):
+    # `units` bookings already run at some instant of [start, end), or at `start` if it is empty
+    points = [start] + [first for first, _, _ in bookings if start < first < end]
+    return any(len(running(bookings, point)) >= units for point in points)
+
+
+def brute_clashes(bookings, start, end, units):
+    if full(bookings, start, end, units):
+        return sorted(owner for first, last, owner in bookings if first < end and last > start)
+    return []
+
+
+def brute_next_free(bookings, time, duration, units):
+    candidates = sorted({time} | {last for _, last, _ in bookings if last > time})
+    for candidate in candidates:
+        if not full(bookings, candidate, candidate + duration, units):
+            return candidate
+
+
+def test_overflow_booking_is_seen_by_later_bookings():
+    intervals = ResourceIntervals(1)
+    assert intervals.book(8, 9, 1) == []
+    assert intervals.book(8, 14, 2) == [1]
+    assert intervals.book(10, 18, 3) == [2]
+    assert sorted(intervals.holders(12)) == [2, 3]
+    assert intervals.next_free(8, 1) == 18
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_random_bookings_match_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    units = int(rng.integers(1, 4))
+    intervals = ResourceIntervals(units)
+    bookings = []
+    for owner in range(40):
+        start = int(rng.integers(0, 60))
+        end = start + int(rng.integers(1, 12))
+        expected = brute_clashes(bookings, start, end, units)
+        assert sorted(intervals.book(start, end, owner)) == expected
+        bookings.append((start, end, owner))
+        if rng.random() < 0.2:
+            start, end, cancelled = bookings.pop(int(rng.integers(len(bookings))))
+            assert intervals.cancel(start, cancelled)
+        time = int(rng.integers(0, 70))
+        duration = int(rng.integers(0, 8))
+        assert sorted(intervals.holders(time)) == sorted(running(bookings, time))
+        assert intervals.next_free(time, duration) == brute_next_free(bookings, time, duration, units)
@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+import Code
+from list_scheduler import list_schedule
+from procedure_table import ProcedureTable
+from schedule_cache import ScheduleCache
+
+EQUIPMENT_UNITS = Code.equipment_units()
+SURGEON_UNITS = Code.surgeon_units()
+
+
+def random_cases(rng, count, first_id=0):
+    return [(first_id + i, 'Emergency' if rng.random() < 0.3 else 'Normal', rng.choice(Code.procedure_names),
+             rng.choice(Code.available_equipment) if rng.random() < 0.5 else None,
+             rng.choice(Code.surgeon_names) if rng.random() < 0.5 else None,
+             rng.randint(0, 20), round(rng.uniform(1, 5), 3)) for i in range(count)]
+
+
+def procedures(cases):
+    return [Code.SurgicalProcedure(*case) for case in cases]
+
+
+def full_schedule(cases, num_rooms):
+    return {procedure.procedure_id: (room, procedure.start_time, procedure.end_time)
+            for procedure, room in list_schedule(procedures(cases), num_rooms, EQUIPMENT_UNITS, SURGEON_UNITS)}
+
+
+def cached_schedule(cache, cases, num_rooms):
+    table, rooms = cache.schedule(procedures(cases), num_rooms, EQUIPMENT_UNITS, SURGEON_UNITS)
+    return {int(procedure_id): (int(room), float(start), float(end)) for procedure_id, room, start, end
+            in zip(table.column('procedure_id'), rooms, table.column('start_time'), table.column('end_time'))}
+
+
+def edit(rng, cases):
+    cases = list(cases)
+    for _ in range(rng.randint(1, 4)):
+        move = rng.random()
+        if move < 0.3 and cases:
+            cases.pop(rng.randrange(len(cases)))
+        elif move < 0.6:
+            cases.extend(random_cases(rng, 1, max((case[0] for case in cases), default=0) + 1))
+        elif cases:
+            i = rng.randrange(len(cases))
+            case = list(cases[i])
+            case[6] = round(rng.uniform(1, 5), 3)
+            cases[i] = tuple(case)
+    return cases
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_partial_replan_matches_full_list_schedule(seed):
+    rng = random.Random(seed)
+    num_rooms = rng.randint(1, 4)
+    cache = ScheduleCache()
+    cases = random_cases(rng, 40)
+    assert cached_schedule(cache, cases, num_rooms) == full_schedule(cases, num_rooms)
+    for _ in range(5):
+        cases = edit(rng, cases)
+        assert cached_schedule(cache, cases, num_rooms) == full_schedule(cases, num_rooms)
+    assert cache.partial_hits > 0
+
+
+def test_exact_hit_and_disk_tier(tmp_path):
+    cases = random_cases(random.Random(1), 30)
+    cache = ScheduleCache(directory=str(tmp_path))
+    first = cached_schedule(cache, cases, 2)
+    assert cached_schedule(cache, cases, 2) == first
+    assert cache.hits == 1
+
+    reloaded = ScheduleCache(directory=str(tmp_path))
+    assert cached_schedule(reloaded, cases, 2) == first
+    assert reloaded.hits == 1
+
+
+def test_empty_base_is_a_miss():
+    cache = ScheduleCache()
+    cache.schedule(ProcedureTable(), 2, EQUIPMENT_UNITS, SURGEON_UNITS)
+    cases = random_cases(random.Random(2), 5)
+    assert cached_schedule(cache, cases, 2) == full_schedule(cases, 2)
+    assert cache.misses == 2
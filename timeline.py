@@ -0,0 +1,124 @@
+import numpy as np
+
+
+class ResourceTimeline:
+    def __init__(self, capacity=16):
+        capacity = max(capacity, 16)
+        self.size = 0
+        self._times = np.zeros(capacity, dtype=np.float64)
+        self._values = np.zeros(capacity, dtype=np.int32)
+        # Area under the step function from the first change point up to each change point
+        self._area = np.zeros(capacity, dtype=np.float64)
+        self._sparse = None
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def times(self):
+        return self._times[:self.size]
+
+    @property
+    def values(self):
+        return self._values[:self.size]
+
+    def points(self):
+        return self.times, self.values
+
+    def record(self, time, value):
+        # Only change points are stored; a repeated value or a second change at the
+        # same instant never adds a point.
+        if self.size:
+            last = self.size - 1
+            if time < self._times[last]:
+                raise ValueError(f"Timeline points must be recorded in time order ({time} < {self._times[last]})")
+            if time == self._times[last]:
+                self._values[last] = value
+                self._sparse = None
+                if last and self._values[last - 1] == value:
+                    self.size -= 1
+                return
+            if self._values[last] == value:
+                return
+        if self.size == self._times.shape[0]:
+            self._grow()
+        index = self.size
+        self._times[index] = time
+        self._values[index] = value
+        if index:
+            self._area[index] = self._area[index - 1] + self._values[index - 1] * (time - self._times[index - 1])
+        self.size += 1
+        self._sparse = None
+
+    def _grow(self):
+        capacity = self._times.shape[0] * 2
+        for name in ('_times', '_values', '_area'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:old.shape[0]] = old
+            setattr(self, name, new)
+
+    def _index_at(self, time):
+        return max(int(np.searchsorted(self.times, time, side='right')) - 1, 0)
+
+    def value_at(self, time):
+        if not self.size:
+            raise ValueError("Timeline is empty")
+        return int(self._values[self._index_at(time)])
+
+    def integral(self, start, stop):
+        return self._area_until(stop) - self._area_until(start)
+
+    def _area_until(self, time):
+        if not self.size:
+            return 0.0
+        if time <= self._times[0]:
+            # The level before the first change point is taken to be the first recorded level
+            return float(self._values[0] * (time - self._times[0]))
+        index = self._index_at(time)
+        return float(self._area[index] + self._values[index] * (time - self._times[index]))
+
+    def utilization(self, start, stop, capacity):
+        # Timelines hold available units, so the busy share is whatever was not available
+        if stop <= start:
+            return 0.0
+        return 1.0 - self.integral(start, stop) / (capacity * (stop - start))
+
+    def minimum(self, start, stop):
+        return self._range_query(start, stop, 0)
+
+    def maximum(self, start, stop):
+        return self._range_query(start, stop, 1)
+
+    def peak_usage(self, start, stop, capacity):
+        return capacity - self.minimum(start, stop)
+
+    def _range_query(self, start, stop, which):
+        if not self.size:
+            raise ValueError("Timeline is empty")
+        first = self._index_at(start)
+        last = max(int(np.searchsorted(self.times, stop, side='left')) - 1, first)
+        tables = self._sparse_tables()[which]
+        level = (last - first + 1).bit_length() - 1
+        pick = np.minimum if which == 0 else np.maximum
+        return int(pick(tables[level][first], tables[level][last - (1 << level) + 1]))
+
+    def _sparse_tables(self):
+        # Built lazily after the last change, then every range query is two lookups
+        if self._sparse is None:
+            minima, maxima = [self.values.copy()], [self.values.copy()]
+            width = 1
+            while 2 * width <= self.size:
+                minima.append(np.minimum(minima[-1][:-width], minima[-1][width:]))
+                maxima.append(np.maximum(maxima[-1][:-width], maxima[-1][width:]))
+                width *= 2
+            self._sparse = (minima, maxima)
+        return self._sparse
+
+    def to_dense(self, start, stop, step=1):
+        grid = np.arange(start, stop, step, dtype=np.float64)
+        if not self.size:
+            return grid, np.zeros(grid.shape[0], dtype=np.int32)
+        indices = np.clip(np.searchsorted(self.times, grid, side='right') - 1, 0, None)
+        return grid, self.values[indices]
+
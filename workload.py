@@ -0,0 +1,150 @@
+import argparse
+import time
+
+import numpy as np
+
+from procedure_io import DEFAULT_CHUNK_SIZE, write_procedures_binary, write_procedures_csv
+from procedure_table import NUMERIC_COLUMNS, ProcedureTable
+
+URGENCY_LEVELS = ['Normal', 'Emergency']
+EMERGENCY_SHARE = 0.3
+# Median duration and log-space spread of each procedure type
+DURATIONS = {'Appendectomy': (2.0, 0.3), 'Cholecystectomy': (2.5, 0.3), 'Hysterectomy': (3.5, 0.35),
+             'Laparoscopy': (2.0, 0.25), 'Prostatectomy': (4.0, 0.4)}
+# None stands for a procedure that needs no specific equipment or surgeon
+EQUIPMENT_MIX = {'Laparoscope': 0.125, 'Endoscope': 0.125, 'Microscope': 0.125, 'Ultrasound': 0.125, None: 0.5}
+SURGEON_MIX = {'Dr. Smith': 0.1, 'Dr. Johnson': 0.1, 'Dr. Brown': 0.1, 'Dr. Davis': 0.1, 'Dr. Garcia': 0.1, None: 0.5}
+ARRIVAL_MODELS = ['uniform', 'poisson', 'profile']
+
+
+class WorkloadSpec:
+    def __init__(self, arrivals='poisson', rate=1.0, horizon=20.0, rate_profile=None, period=60.0,
+                 emergency_share=EMERGENCY_SHARE, durations=None, procedure_mix=None,
+                 equipment_mix=None, surgeon_mix=None):
+        # rate is arrivals per time unit for 'poisson'; 'profile' repeats rate_profile, one
+        # rate per period, around the clock; 'uniform' spreads arrivals over [0, horizon)
+        if arrivals not in ARRIVAL_MODELS:
+            raise ValueError(f"Unknown arrival model: {arrivals}")
+        if arrivals == 'profile' and not rate_profile:
+            raise ValueError("The 'profile' arrival model needs a rate_profile")
+        self.arrivals = arrivals
+        self.rate = rate
+        self.horizon = horizon
+        self.rate_profile = list(rate_profile or [])
+        self.period = period
+        self.emergency_share = emergency_share
+        self.durations = dict(DURATIONS if durations is None else durations)
+        self.procedure_mix = dict({name: 1.0 for name in self.durations} if procedure_mix is None else procedure_mix)
+        if not self.procedure_mix:
+            raise ValueError("The workload needs at least one procedure type")
+        # An empty equipment or surgeon mix means no case needs one
+        self.equipment_mix = dict(EQUIPMENT_MIX if equipment_mix is None else equipment_mix) or {None: 1.0}
+        self.surgeon_mix = dict(SURGEON_MIX if surgeon_mix is None else surgeon_mix) or {None: 1.0}
+
+
+def _mix(mix):
+    # Splits a {value: weight} mix into the category list and normalised probabilities;
+    # the last probability slot, if any, belongs to None and maps to the missing code -1
+    categories = [value for value in mix if value is not None]
+    weights = np.array([mix[value] for value in categories] + ([mix[None]] if None in mix else []), dtype=np.float64)
+    return categories, weights / weights.sum()
+
+
+def _sample_codes(rng, mix, size):
+    categories, probabilities = _mix(mix)
+    codes = rng.choice(probabilities.shape[0], size=size, p=probabilities).astype(np.int16)
+    codes[codes >= len(categories)] = -1
+    return codes, categories
+
+
+def _profile_times(operational, rate_profile, period):
+    # Inverts the cumulative intensity of a piecewise-constant rate that repeats every
+    # len(rate_profile) periods, mapping unit-rate arrival times onto the clock
+    rates = np.asarray(rate_profile, dtype=np.float64)
+    cumulative = np.concatenate([[0.0], np.cumsum(rates * period)])
+    cycle_length = period * rates.shape[0]
+    cycles, within = np.divmod(operational, cumulative[-1])
+    breakpoints = np.arange(rates.shape[0] + 1) * period
+    return cycles * cycle_length + np.interp(within, cumulative, breakpoints)
+
+
+def sample_arrivals(rng, spec, size, offset=0.0):
+    # offset carries the last arrival (or operational time for profiles) across chunks
+    if spec.arrivals == 'uniform':
+        return np.sort(rng.uniform(0.0, spec.horizon, size)), offset
+    gaps = rng.exponential(1.0, size)
+    operational = offset + np.cumsum(gaps)
+    last = float(operational[-1]) if size else offset
+    if spec.arrivals == 'poisson':
+        return operational / spec.rate, last
+    return _profile_times(operational, spec.rate_profile, spec.period), last
+
+
+def generate_batch(rng, spec, size, first_id=0, arrival_offset=0.0):
+    urgency = (rng.random(size) < spec.emergency_share).astype(np.int16)
+    names, name_categories = _sample_codes(rng, spec.procedure_mix, size)
+    equipment, equipment_categories = _sample_codes(rng, spec.equipment_mix, size)
+    surgeons, surgeon_categories = _sample_codes(rng, spec.surgeon_mix, size)
+
+    medians = np.array([spec.durations[name][0] for name in name_categories])
+    sigmas = np.array([spec.durations[name][1] for name in name_categories])
+    durations = rng.lognormal(np.log(medians[names]), sigmas[names])
+    arrivals, arrival_offset = sample_arrivals(rng, spec, size, arrival_offset)
+
+    columns = {'procedure_id': np.arange(first_id, first_id + size, dtype=np.int64),
+               'arrival_time': arrivals, 'duration': durations}
+    for name in ('start_time', 'end_time'):
+        columns[name] = np.full(size, np.nan)
+    columns = {name: np.ascontiguousarray(columns[name], dtype=dtype) for name, dtype in NUMERIC_COLUMNS.items()}
+    codes = {'urgency_level': urgency, 'procedure_name': names, 'equipment': equipment, 'surgeon': surgeons}
+    categories = {'urgency_level': URGENCY_LEVELS, 'procedure_name': name_categories,
+                  'equipment': equipment_categories, 'surgeon': surgeon_categories}
+    return ProcedureTable.from_arrays(columns, codes, categories), arrival_offset
+
+
+def iter_workload_batches(num_procedures, spec=None, seed=0, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Chunks come out in arrival order for the Poisson and profile models, so they can be
+    # fed straight to phase1.stream_surgeries; uniform arrivals are only sorted per chunk
+    spec = spec or WorkloadSpec()
+    rng = np.random.default_rng(seed)
+    offset = 0.0
+    for start in range(0, num_procedures, chunk_size):
+        batch, offset = generate_batch(rng, spec, min(chunk_size, num_procedures - start), start, offset)
+        yield batch
+
+
+def generate_procedures(num_procedures, spec=None, seed=0):
+    batch, _ = generate_batch(np.random.default_rng(seed), spec or WorkloadSpec(), num_procedures)
+    return batch
+
+
+def write_workload(path, num_procedures, spec=None, seed=0, chunk_size=DEFAULT_CHUNK_SIZE, binary=False):
+    batches = iter_workload_batches(num_procedures, spec, seed, chunk_size)
+    if binary:
+        return write_procedures_binary(batches, path)
+    return write_procedures_csv(batches, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic procedure workload.")
+    parser.add_argument('procedures', type=int)
+    parser.add_argument('path', help="CSV file, or a directory with --binary")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--arrivals', choices=ARRIVAL_MODELS, default='poisson')
+    parser.add_argument('--rate', type=float, default=1.0)
+    parser.add_argument('--horizon', type=float, default=20.0)
+    parser.add_argument('--rate-profile', type=float, nargs='+', help="arrival rate for each period of the cycle")
+    parser.add_argument('--period', type=float, default=60.0)
+    parser.add_argument('--emergency-share', type=float, default=EMERGENCY_SHARE)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--binary', action='store_true', help="write the memory-mappable column format")
+    args = parser.parse_args()
+
+    spec = WorkloadSpec(args.arrivals, args.rate, args.horizon, args.rate_profile, args.period, args.emergency_share)
+    start = time.perf_counter()
+    written = write_workload(args.path, args.procedures, spec, args.seed, args.chunk_size, args.binary)
+    print(f"Wrote {written} procedures to {args.path} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()